@@ -0,0 +1,178 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Diagramme der Benchmark-Ansicht (Gesamt und je Filiale).
+# Alle Werte, Farben und Texte werden spaltenweise berechnet, die Soll-Markierungen
+# sind ein einzelner Trace - der Aufwand hängt nicht von der Anzahl Filialen ab.
+
+POSITIV = '#2E8B09'
+NEGATIV = '#D20103'
+POSITIV_HELL = '#9CD884'
+NEGATIV_HELL = '#E49D9D'
+
+
+def benchmark_chart_data(data):
+    """
+    IST, SOLL WERT und Abweichung je Filiale.
+    """
+    chart_data = data.groupby('FILIALE')[['IST', 'DIFF', 'SOLL WERT']].sum().reset_index()
+    chart_data['DIFF'] = chart_data['DIFF'].abs().round(0)
+    return chart_data
+
+
+def benchmark_overview_data(chart_data):
+    """
+    Eine Zeile 'Gesamt' über alle Filialen.
+    """
+    total_ist = chart_data['IST'].sum()
+    total_soll = chart_data['SOLL WERT'].sum()
+    return pd.DataFrame({
+        'FILIALE': ['Gesamt'],
+        'IST': [total_ist],
+        'SOLL WERT': [total_soll],
+        'DIFF': [abs(total_ist - total_soll)],
+    })
+
+
+def _tausender(values):
+    # 12345 -> '12.345'
+    return [f"{v:,.0f}".replace(',', '.') for v in values]
+
+
+def _ganzzahl(values):
+    # 12345 -> '12,345' (wie bisher in den Abweichungstexten)
+    return [f"{int(v):,}" for v in values]
+
+
+def build_benchmark_figure(chart_data, value_filter, **layout):
+    """
+    Gestapelte Balken IST/SOLL je Zeile von chart_data.
+
+    Parameters:
+    chart_data (pandas.DataFrame): Spalten FILIALE, IST, SOLL WERT, DIFF (eine Zeile je Balken).
+    value_filter (str): 'Prozentual' oder 'Numerisch'.
+    layout: Weitere Layout-Angaben (title, yaxis_title, height, width, margin).
+
+    Returns:
+    plotly.graph_objects.Figure: Das fertige Diagramm.
+    """
+    ist = chart_data['IST'].to_numpy(dtype=float)
+    soll = chart_data['SOLL WERT'].to_numpy(dtype=float)
+    diff = chart_data['DIFF'].to_numpy(dtype=float)
+
+    ueber = ist > soll
+    erreicht = ist >= soll
+    unter = ist < soll
+
+    y_labels = [
+        f"{filiale} - Soll: {text}"
+        for filiale, text in zip(chart_data['FILIALE'], _tausender(soll))
+    ]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        diff_prozent = diff / soll * 100
+        change = np.round((ist - soll) / soll * 100, 1)
+
+    fig = go.Figure()
+
+    if value_filter == 'Prozentual':
+        basis = np.round(np.where(unter, 100 - diff_prozent, 100), 1)
+        label = np.char.add(np.where(change > 0, '+', ''), np.char.mod('%.1f%%', change))
+
+        # Basis-Balken (100% oder weniger), Text nur wenn IST < SOLL WERT
+        fig.add_trace(go.Bar(
+            x=basis,
+            y=y_labels,
+            name='Basis',
+            orientation='h',
+            showlegend=False,
+            marker_color=np.where(ueber, POSITIV, NEGATIV),
+            text=np.where(unter, np.char.mod('%.1f%%', basis), ''),
+            textposition='auto',
+            textfont=dict(color='white', size=15),
+        ))
+        # Zusatz-Balken mit der prozentualen Abweichung
+        fig.add_trace(go.Bar(
+            x=diff_prozent,
+            y=y_labels,
+            name='Zusatz',
+            orientation='h',
+            showlegend=False,
+            marker_color=np.where(erreicht, POSITIV_HELL, NEGATIV_HELL),
+            text=label,
+            textposition='outside',
+            textfont=dict(color=np.where(ueber, 'green', 'red'), size=15),
+            cliponaxis=True,
+        ))
+
+        # Linie bei 100%
+        fig.add_shape(
+            type='line',
+            x0=100,
+            x1=100,
+            y0=-0.5,
+            y1=len(chart_data) - 0.5,
+            line=dict(color='red', width=2, dash='dash'),
+        )
+    else:
+        ist_text = np.where(unter, _tausender(ist), '')
+        ist_ganz = np.asarray(_ganzzahl(ist), dtype=object)
+        diff_ganz = np.asarray(_ganzzahl(diff), dtype=object)
+        diff_text = np.where(
+            erreicht,
+            ist_ganz + "   (+ <span style='color:green'>" + diff_ganz + "</span> Abw.)",
+            "- <span style='color:red'>" + diff_ganz + "</span> Abw.",
+        )
+
+        fig.add_trace(go.Bar(
+            x=np.where(ueber, ist - diff, ist),
+            y=y_labels,
+            name='IST',
+            orientation='h',
+            showlegend=False,
+            marker_color=np.where(ueber, POSITIV, NEGATIV),
+            text=ist_text,
+            textposition='auto',
+            textfont=dict(color='white', size=15),
+        ))
+        fig.add_trace(go.Bar(
+            x=diff,
+            y=y_labels,
+            name='SOLL',
+            orientation='h',
+            showlegend=False,
+            marker_color=np.where(erreicht, POSITIV_HELL, NEGATIV_HELL),
+            text=diff_text,
+            textposition='outside',
+            textfont=dict(color=np.where(erreicht, 'black', 'red'), size=15),
+            cliponaxis=False,
+        ))
+
+        # Soll-Markierungen als ein Trace (senkrechter Strich je Balken, ~80% der Zeilenhöhe)
+        margin = layout.get('margin', {})
+        plot_height = layout.get('height', 450) - margin.get('t', 80) - margin.get('b', 80)
+        fig.add_trace(go.Scatter(
+            x=soll,
+            y=y_labels,
+            mode='markers',
+            name='SOLL WERT',
+            showlegend=False,
+            marker=dict(
+                symbol='line-ns',
+                size=max(plot_height / max(len(chart_data), 1) * 0.8, 4),
+                line=dict(color='red', width=2),
+            ),
+            hovertemplate='Soll: %{x:,.0f}<extra></extra>',
+        ))
+
+    fig.update_layout(
+        barmode='stack',
+        yaxis_tickangle=0,
+        xaxis_title='Kontrollen',
+        xaxis=dict(automargin=True),
+        yaxis=dict(automargin=True),
+        **layout,
+    )
+    return fig
+
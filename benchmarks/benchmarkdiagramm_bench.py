@@ -0,0 +1,198 @@
+"""
+Laufzeitvergleich des Benchmark-Diagramms: bisheriger zeilenweiser Aufbau
+(apply je Zeile, eine Shape je Filiale) gegen build_benchmark_figure.
+
+Aufruf: python benchmarks/benchmarkdiagramm_bench.py
+"""
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarkdiagramm import build_benchmark_figure  # noqa: E402
+
+
+def build_rowwise(chart_data, value_filter):
+    """
+    Diagramm je Filiale wie vor der spaltenweisen Umstellung (feibra_DD.py, Benchmark-Ansicht).
+    chart_data: Spalten FILIALE, IST, SOLL WERT, DIFF (wie benchmark_chart_data).
+    """
+    chart_data = chart_data.copy()
+    chart_data['100%'] = 100
+
+    # Berechnung der prozentualen Abweichung
+    chart_data['DIFF_prozent'] = (chart_data['DIFF'] / chart_data['SOLL WERT']) * 100
+
+    # Berechnung der beiden Balken
+    chart_data['Abweichung'] = chart_data['DIFF_prozent']
+    chart_data['Basis'] = chart_data.apply(
+        lambda row: 100 - row['DIFF_prozent'] if row['IST'] < row['SOLL WERT'] else 100,
+        axis=1
+    ).round(1)
+    chart_data['Basis'] = chart_data['Basis'].apply(lambda x: f"{x}%")
+
+    chart_data['Zusatz'] = chart_data.apply(
+        lambda row: row['DIFF_prozent'],
+        axis=1
+    )
+
+    fig = go.Figure()
+
+    if value_filter == 'Prozentual':
+        chart_data['label'] = ((chart_data['IST'] - chart_data['SOLL WERT']) / chart_data['SOLL WERT'] * 100).round(1)
+        chart_data['label'] = chart_data['label'].apply(lambda x: f"{'+' if x > 0 else ''}{x}%")
+
+        chart_data['y_labels'] = chart_data.apply(
+            lambda row: f"{row['FILIALE']} - Soll: {row['SOLL WERT']:,.0f}".replace(',', '.'),
+            axis=1
+        )
+        fig.add_trace(go.Bar(
+            x=chart_data['Basis'],
+            y=chart_data['y_labels'],
+            name='Basis',
+            orientation='h',
+            showlegend=False,
+            marker_color=chart_data.apply(
+                lambda row: '#2E8B09' if row['IST'] > row['SOLL WERT'] else '#D20103',
+                axis=1,
+            ),
+            text=chart_data.apply(
+                lambda row: row['Basis'] if row['IST'] < row['SOLL WERT'] else '',
+                axis=1
+            ),
+            textposition='auto',
+            textfont=dict(color='white', size=15),
+        ))
+        fig.add_trace(go.Bar(
+            x=chart_data['Zusatz'],
+            y=chart_data['y_labels'],
+            name='Zusatz',
+            orientation='h',
+            showlegend=False,
+            marker_color=chart_data.apply(
+                lambda row: '#9CD884' if row['IST'] >= row['SOLL WERT'] else '#E49D9D',
+                axis=1
+            ),
+            text=chart_data.apply(lambda row: row['label'], axis=1),
+            textposition='outside',
+            textfont=dict(
+                color=chart_data.apply(
+                    lambda row: 'red' if row['IST'] <= row['SOLL WERT'] else 'green',
+                    axis=1,
+                ),
+                size=15,
+            ),
+            cliponaxis=True
+        ))
+        fig.add_shape(
+            type='line',
+            x0=100,
+            x1=100,
+            y0=-0.5,
+            y1=len(chart_data['FILIALE']) - 0.5,
+            line=dict(color='red', width=2, dash='dash'),
+        )
+    else:
+        chart_data['IST_bereinigt'] = chart_data.apply(
+            lambda row: row['IST'] - row['DIFF'] if row['IST'] > row['SOLL WERT'] else row['IST'],
+            axis=1
+        )
+        chart_data['y_labels'] = chart_data.apply(
+            lambda row: f"{row['FILIALE']} - Soll: {row['SOLL WERT']:,.0f}".replace(',', '.'),
+            axis=1
+        )
+        fig.add_trace(go.Bar(
+            x=chart_data['IST_bereinigt'],
+            y=chart_data['y_labels'],
+            name='IST',
+            orientation='h',
+            showlegend=False,
+            marker_color=chart_data.apply(
+                lambda row: '#2E8B09' if row['IST'] > row['SOLL WERT'] else '#D20103',
+                axis=1
+            ),
+            text=chart_data.apply(
+                lambda row: '{:,.0f}'.format(row['IST']).replace(',', '.') if row['IST'] < row['SOLL WERT'] else '',
+                axis=1
+            ),
+            textposition='auto',
+            textfont=dict(color='white', size=15),
+        ))
+        fig.add_trace(go.Bar(
+            x=chart_data['DIFF'],
+            y=chart_data['y_labels'],
+            name='SOLL',
+            orientation='h',
+            showlegend=False,
+            marker_color=chart_data.apply(
+                lambda row: '#9CD884' if row['IST'] >= row['SOLL WERT'] else '#E49D9D',
+                axis=1
+            ),
+            text=chart_data.apply(
+                lambda row: f"{int(row['IST']):,}   (+ <span style='color:green'>{int(row['DIFF']):,}</span> Abw.)" if row['IST'] >= row['SOLL WERT'] else f"- <span style='color:red'>{int(row['DIFF']):,}</span> Abw.",
+                axis=1
+            ),
+            textposition='outside',
+            textfont=dict(
+                color=chart_data.apply(
+                    lambda row: 'black' if row['IST'] >= row['SOLL WERT'] else 'red',
+                    axis=1,
+                ),
+                size=15
+            ),
+            cliponaxis=False
+        ))
+        for idx, row in chart_data.iterrows():
+            fig.add_shape(
+                type='line',
+                x0=row['SOLL WERT'],
+                x1=row['SOLL WERT'],
+                y0=idx - 0.4,
+                y1=idx + 0.4,
+                line=dict(color='red', width=2, dash='dash'),
+            )
+
+    fig.update_layout(
+        barmode='stack',
+        yaxis_tickangle=0,
+        title='Benchmark Visualisierung',
+        xaxis_title='Kontrollen',
+        yaxis_title='Filiale',
+        height=600,
+        xaxis=dict(automargin=True),
+        yaxis=dict(automargin=True),
+    )
+    return fig
+
+
+def sample_chart_data(n, seed=0):
+    rng = np.random.default_rng(seed)
+    chart_data = pd.DataFrame({
+        'FILIALE': [f'Fil{i:04d}' for i in range(n)],
+        'IST': rng.integers(500, 1500, n).astype(float),
+        'SOLL WERT': rng.integers(500, 1500, n).astype(float),
+    })
+    chart_data['DIFF'] = (chart_data['IST'] - chart_data['SOLL WERT']).abs()
+    return chart_data
+
+
+def main():
+    layout = dict(title='Benchmark Visualisierung', yaxis_title='Filiale', height=600, margin=dict(t=70, b=50))
+    print(f"{'Filialen':>9} {'Werte':>11} {'zeilenweise':>12} {'spaltenweise':>13}")
+    # Der zeilenweise Aufbau wächst quadratisch (add_shape je Filiale), daher keine größeren Mengen
+    for n in (12, 50, 200):
+        chart_data = sample_chart_data(n)
+        for value_filter in ('Numerisch', 'Prozentual'):
+            runs = 3
+            alt = timeit.timeit(lambda: build_rowwise(chart_data, value_filter), number=runs) / runs
+            neu = timeit.timeit(lambda: build_benchmark_figure(chart_data, value_filter, **layout), number=runs) / runs
+            print(f"{n:>9} {value_filter:>11} {alt * 1000:>10.1f}ms {neu * 1000:>11.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
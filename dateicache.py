@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Persistenter Cache für bereits eingelesene Dateien.
+# Schlüssel ist ein Hash über den Dateiinhalt, abgelegt wird das
+# aufbereitete DataFrame als Parquet inkl. Zuordnung (Benchmark/Monat).
+
+CACHE_DIR = Path(os.environ.get('DATENTOOL_CACHE_DIR', Path.home() / '.cache' / 'datentool'))
+CACHE_LIMIT_MB = int(os.environ.get('DATENTOOL_CACHE_MB', 512))
+
+META_KEY = b'datentool'
+
+
+def content_key(content, *salt):
+    """
+    Berechnet den Cache-Schlüssel aus Dateiinhalt und Verarbeitungsparametern.
+    """
+    h = hashlib.sha256(content)
+    # Geänderte Parameter (z.B. Zusatzinfo-Listen) ergeben einen neuen Schlüssel
+    h.update(repr(salt).encode())
+    return h.hexdigest()
+
+
+def _path(key, cache_dir=None):
+    return Path(cache_dir or CACHE_DIR) / f'{key}.parquet'
+
+
+def get(key, cache_dir=None):
+    """
+    Liefert (DataFrame, Metadaten) aus dem Cache oder None.
+    """
+    path = _path(key, cache_dir)
+    if not path.exists():
+        return None
+    try:
+        table = pq.read_table(path)
+        meta = json.loads(table.schema.metadata[META_KEY])
+        df = table.to_pandas()
+    except Exception:
+        # Beschädigte Datei verwerfen
+        path.unlink(missing_ok=True)
+        return None
+    # Zugriffszeit für LRU aktualisieren
+    os.utime(path)
+    return df, meta
+
+
+def put(key, df, meta, cache_dir=None, limit_mb=None):
+    """
+    Legt ein DataFrame im Cache ab und verdrängt ggf. alte Einträge.
+
+    Returns:
+    bool: True, wenn gespeichert wurde.
+    """
+    path = _path(key, cache_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        table = pa.Table.from_pandas(df)
+        metadata = dict(table.schema.metadata or {})
+        metadata[META_KEY] = json.dumps(meta).encode()
+        table = table.replace_schema_metadata(metadata)
+        # Erst temporär schreiben, damit parallele Sessions keine halben Dateien lesen
+        tmp_path = path.with_suffix('.tmp')
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+    except Exception:
+        # z.B. Spalten mit gemischten Typen - dann eben ohne Cache
+        return False
+    evict(limit_mb, cache_dir)
+    return True
+
+
+def _entries(cache_dir=None):
+    cache_dir = Path(cache_dir or CACHE_DIR)
+    if not cache_dir.exists():
+        return []
+    return [p for p in cache_dir.glob('*.parquet') if p.is_file()]
+
+
+def evict(limit_mb=None, cache_dir=None):
+    """
+    Löscht die am längsten nicht genutzten Einträge, bis das Limit eingehalten ist.
+    """
+    limit = (CACHE_LIMIT_MB if limit_mb is None else limit_mb) * 1024 * 1024
+    entries = sorted(_entries(cache_dir), key=lambda p: p.stat().st_mtime)
+    total = sum(p.stat().st_size for p in entries)
+    for p in entries:
+        if total <= limit:
+            break
+        total -= p.stat().st_size
+        p.unlink(missing_ok=True)
+
+
+def stats(cache_dir=None):
+    """
+    Returns:
+    tuple: (Anzahl Einträge, Größe in MB)
+    """
+    entries = _entries(cache_dir)
+    return len(entries), sum(p.stat().st_size for p in entries) / (1024 * 1024)
+
+
+def purge(cache_dir=None):
+    """
+    Leert den Cache vollständig.
+    """
+    for p in _entries(cache_dir):
+        p.unlink(missing_ok=True)
@@ -0,0 +1,510 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from multiprocessing import get_all_start_methods, get_context
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from openpyxl import load_workbook
+from pandas.api.types import union_categoricals
+
+import zusatzinfo
+
+# Dieses Modul enthält kein Streamlit, damit die Worker-Prozesse es
+# importieren können, ohne die App-Oberfläche erneut auszuführen
+# (die App setzt dafür ihren Modul-Spec, siehe feibra_DD.py).
+
+EXCEL_ENDUNGEN = ('.xlsx',)
+CSV_ENDUNGEN = ('.csv',)
+PARQUET_ENDUNGEN = ('.parquet', '.pq')
+FEATHER_ENDUNGEN = ('.feather', '.arrow')
+
+# Bei Änderungen an der Aufbereitung erhöhen - macht alte Cache-Einträge ungültig
+PARSER_VERSION = 6
+
+# Spalten, die für reguläre Kontroll-Dateien benötigt werden
+REGULAR_REQUIRED = ('KONTROLLE', 'ZUSATZINFO')
+REGULAR_COLUMNS = (
+    'ERFASST', 'GEBIET', 'FILIALE', 'ERFASSER', 'NAME/VT/ABNEHMER',
+    'TYPE', 'KONTROLLE', 'ZUSATZINFO',
+)
+REGULAR_DTYPES = {
+    'GEBIET': str,
+    'FILIALE': str,
+    'ERFASSER': str,
+    'NAME/VT/ABNEHMER': str,
+    'TYPE': str,
+    'KONTROLLE': str,
+    'ZUSATZINFO': str,
+}
+
+# KONTROLLE, wie sie in der Datei stand (vor der Einstufung als PERF. NICHT_OK)
+KONTROLLE_RAW = 'KONTROLLE_ROH'
+
+# Wiederholte Textspalten der Kontrolldaten werden als Kategorien gespeichert
+KONTROLL_CATEGORIES = (
+    'FILIALE', 'ERFASSER', 'NAME/VT/ABNEHMER', 'TYPE', 'KONTROLLE', 'GEBIET', 'PLZ', KONTROLLE_RAW,
+)
+
+
+def apply_schema(df):
+    """
+    Wandelt die wiederholten Textspalten in Kategorien um.
+
+    Returns:
+    tuple: (DataFrame, Speicherbericht als DataFrame in MB je Spalte)
+    """
+    before = df.memory_usage(deep=True, index=False)
+
+    for col in KONTROLL_CATEGORIES:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+
+    after = df.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        'Vorher (MB)': before / (1024 * 1024),
+        'Nachher (MB)': after / (1024 * 1024),
+    }).round(2)
+    report.loc['Gesamt'] = report.sum()
+    return df, report
+
+# Große Kontroll-Dateien werden zeilenweise in Blöcken gelesen statt über pd.read_excel
+STREAMING_MIN_BYTES = int(os.environ.get('DATENTOOL_STREAMING_MB', 10)) * 1024 * 1024
+CHUNK_ROWS = 50_000
+
+
+def concat_frames(frames):
+    """
+    Wie pd.concat(frames, ignore_index=True), behält aber kategorische Spalten
+    als Kategorien (vereinigte Kategorien statt Rückfall auf object).
+    """
+    if len(frames) == 1:
+        return frames[0].reset_index(drop=True)
+
+    columns = list(dict.fromkeys(col for f in frames for col in f.columns))
+    cat_cols = [
+        col for col in columns
+        if all(col in f.columns and isinstance(f[col].dtype, pd.CategoricalDtype) for f in frames)
+    ]
+    result = pd.concat([f.drop(columns=cat_cols) for f in frames], ignore_index=True)
+    for col in cat_cols:
+        result[col] = union_categoricals([f[col] for f in frames], ignore_order=True)
+    return result[columns]
+
+# Prozess-Pool erst ab dieser Gesamtgröße bzw. Dateianzahl - darunter ist der
+# Start der Worker teurer als das Einlesen selbst
+PARALLEL_MIN_BYTES = int(os.environ.get('DATENTOOL_PARALLEL_MB', 16)) * 1024 * 1024
+PARALLEL_MIN_FILES = 2
+PARALLEL_WORKERS = os.cpu_count() or 1
+
+# Standard-Schlüssel einer Kontrolle für das Entfernen von Duplikaten
+DEDUP_KEY = ('ERFASST', 'GEBIET', 'ERFASSER', 'TYPE')
+
+
+def deduplicate(frames, key_columns):
+    """
+    Entfernt doppelte Kontrollen über alle Dateien hinweg (erste Fundstelle bleibt).
+    Je Zeile wird ein 64-Bit-Hash über die Schlüsselspalten gebildet; die Suche nach
+    Duplikaten läuft vektorisiert über alle Hashes.
+
+    Parameters:
+    frames (list): DataFrames in Upload-Reihenfolge.
+    key_columns (tuple): Schlüsselspalten (fehlende Spalten werden ignoriert).
+
+    Returns:
+    tuple: (bereinigte DataFrames, Anzahl entfernter Zeilen je DataFrame)
+    """
+    if not frames or not key_columns:
+        return frames, [0] * len(frames)
+
+    hashes = []
+    for df in frames:
+        cols = [col for col in key_columns if col in df.columns]
+        if cols:
+            hashes.append(pd.util.hash_pandas_object(df[cols], index=False).to_numpy())
+        else:
+            # Ohne Schlüsselspalten kann nichts als Duplikat erkannt werden
+            hashes.append(np.arange(len(df), dtype=np.uint64) + np.uint64(sum(len(h) for h in hashes)))
+    all_hashes = np.concatenate(hashes)
+    duplicated = pd.Series(all_hashes).duplicated(keep='first').to_numpy()
+
+    result, removed = [], []
+    offset = 0
+    for df, h in zip(frames, hashes):
+        dup = duplicated[offset:offset + len(h)]
+        offset += len(h)
+        removed.append(int(dup.sum()))
+        result.append(df[~dup] if dup.any() else df)
+    return result, removed
+
+
+def _as_str(series):
+    # Wie read_excel(dtype=str): Werte als Text, fehlende Werte bleiben NaN
+    return series.where(series.isna(), series.astype(str))
+
+
+def read_regular_streaming(content, columns, registry, verteiler_zusatzinfos, chunk_rows=CHUNK_ROWS):
+    """
+    Liest eine Kontroll-Datei zeilenweise (openpyxl read-only) in Blöcken von chunk_rows Zeilen.
+    Jeder Block wird sofort aufbereitet und kompakt (Kategorien) abgelegt, sodass der
+    Speicherbedarf mit der Blockgröße und nicht mit der Dateigröße wächst.
+
+    Parameters:
+    columns (list): Kopfzeile aus sniff_header.
+    """
+    positions = [(i, col) for i, col in enumerate(columns) if col in REGULAR_COLUMNS]
+
+    def build_chunk(rows):
+        chunk = pd.DataFrame(rows, columns=[col for _, col in positions])
+        for col in REGULAR_DTYPES:
+            if col in chunk.columns:
+                chunk[col] = _as_str(chunk[col])
+        chunk = prepare_regular(chunk, registry, verteiler_zusatzinfos)
+        for col in KONTROLL_CATEGORIES:
+            if col in chunk.columns:
+                chunk[col] = chunk[col].astype('category')
+        return chunk
+
+    wb = load_workbook(BytesIO(content), read_only=True, data_only=True)
+    chunks = []
+    try:
+        ws = wb.worksheets[0]
+        rows = []
+        for row in ws.iter_rows(min_row=2, values_only=True):
+            # Leere Zeilen überspringen (wie read_excel)
+            if all(value is None for value in row):
+                continue
+            rows.append([row[i] if i < len(row) else None for i, _ in positions])
+            if len(rows) >= chunk_rows:
+                chunks.append(build_chunk(rows))
+                rows = []
+        if rows or not chunks:
+            chunks.append(build_chunk(rows))
+    finally:
+        wb.close()
+
+    return concat_frames(chunks)
+
+
+def sniff_header(content):
+    """
+    Liest nur die Kopfzeile des ersten Tabellenblatts (read-only).
+
+    Returns:
+    list: Spaltennamen (leere Kopfzellen als '', damit die Positionen erhalten bleiben).
+    """
+    wb = load_workbook(BytesIO(content), read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        header = next(ws.iter_rows(min_row=1, max_row=1, values_only=True), ())
+    finally:
+        wb.close()
+    return ['' if col is None else str(col) for col in header]
+
+
+def file_format(name):
+    """
+    Returns:
+    str: 'xlsx', 'csv', 'parquet', 'feather' oder None für nicht unterstützte Dateien.
+    """
+    lower = name.lower()
+    for fmt, endungen in (
+        ('xlsx', EXCEL_ENDUNGEN),
+        ('csv', CSV_ENDUNGEN),
+        ('parquet', PARQUET_ENDUNGEN),
+        ('feather', FEATHER_ENDUNGEN),
+    ):
+        if lower.endswith(endungen):
+            return fmt
+    return None
+
+
+def _csv_options(content):
+    """
+    Bestimmt Kodierung und Trennzeichen (Semikolon oder Komma) aus der ersten Zeile.
+
+    Returns:
+    tuple: (Kopfzeile als Liste, ReadOptions, ParseOptions)
+    """
+    first_line = content.split(b'\n', 1)[0].rstrip(b'\r')
+    try:
+        header_line = first_line.decode('utf-8-sig')
+        encoding = 'utf8'
+    except UnicodeDecodeError:
+        header_line = first_line.decode('latin-1')
+        encoding = 'latin1'
+    delimiter = ';' if header_line.count(';') >= header_line.count(',') else ','
+    columns = [col.strip().strip('"') for col in header_line.split(delimiter)]
+    return (
+        columns,
+        pa_csv.ReadOptions(use_threads=True, encoding=encoding),
+        pa_csv.ParseOptions(delimiter=delimiter),
+    )
+
+
+def sniff_columns(name, content):
+    """
+    Liest nur die Spaltennamen einer Datei (Kopfzeile bzw. Schema).
+    """
+    fmt = file_format(name)
+    if fmt == 'xlsx':
+        return sniff_header(content)
+    if fmt == 'csv':
+        return _csv_options(content)[0]
+    if fmt == 'parquet':
+        return pq.read_schema(pa.BufferReader(content)).names
+    if fmt == 'feather':
+        return pa.ipc.open_file(pa.BufferReader(content)).schema.names
+    raise ValueError(f"{name}: Dateiformat nicht unterstützt")
+
+
+def read_columnar(name, content, columns=None, dtypes=None):
+    """
+    Liest CSV (mehrere Threads), Parquet oder Feather über Arrow ein.
+
+    Parameters:
+    columns (list): Nur diese Spalten lesen (None = alle).
+    dtypes (dict): Spalten, die als Text gelesen werden sollen.
+    """
+    fmt = file_format(name)
+    if fmt == 'csv':
+        _, read_options, parse_options = _csv_options(content)
+        convert_options = pa_csv.ConvertOptions(
+            include_columns=columns,
+            include_missing_columns=False,
+            column_types={col: pa.string() for col in (dtypes or {})},
+            strings_can_be_null=True,
+        )
+        table = pa_csv.read_csv(pa.BufferReader(content), read_options, parse_options, convert_options)
+    elif fmt == 'parquet':
+        # Nur die benötigten Spalten werden dekodiert
+        table = pq.read_table(pa.BufferReader(content), columns=columns)
+    elif fmt == 'feather':
+        # Unkomprimiertes Feather wird ohne Kopie aus dem Puffer gelesen
+        table = feather.read_table(pa.BufferReader(content), columns=columns, memory_map=False)
+    else:
+        raise ValueError(f"{name}: Dateiformat nicht unterstützt")
+
+    df = table.to_pandas()
+    for col in dtypes or {}:
+        if col in df.columns:
+            # Auch Kategorien (Parquet/Feather mit dictionary-Spalten) als Text, damit später
+            # neue Werte wie PERF. NICHT_OK gesetzt werden können; apply_schema kategorisiert erneut
+            df[col] = _as_str(df[col].astype(object))
+    return df
+
+
+def classify_columns(columns, special_column, monthly_columns):
+    """
+    Ordnet eine Datei anhand ihrer Spalten zu.
+
+    Returns:
+    tuple: (special, monthly, regular) - regular ist False für unbekannte Dateien.
+    """
+    special = special_column in columns
+    monthly = [col for col in monthly_columns if col in columns]
+    regular = not special and not monthly and all(col in columns for col in REGULAR_REQUIRED)
+    return special, monthly, regular
+
+
+def prepare_regular(df, registry, verteiler_zusatzinfos):
+    """
+    Bereitet eine reguläre Kontroll-Datei auf (ERFASST, PLZ, Fil12, Zusatzinfo-Maske, PERF. NICHT_OK).
+    """
+    # Konvertiere die 'ERFASST' Spalte in datetime
+    if 'ERFASST' in df.columns:
+        df['ERFASST'] = pd.to_datetime(df['ERFASST'], format='%d.%m.%Y %H:%M:%S', errors='coerce')
+
+    if 'GEBIET' in df.columns:
+        df['PLZ'] = df['GEBIET'].str[:4]
+
+    if 'FILIALE' in df.columns:
+        df = df[df['FILIALE'] != 'Fil12'].copy()
+
+    return encode_zusatzinfo(df, registry, verteiler_zusatzinfos)
+
+
+def encode_zusatzinfo(df, registry, verteiler_zusatzinfos):
+    """
+    ZUSATZINFO in Bitmaske und Rest übersetzen; Verteiler-Zusatzinfos setzen PERF. NICHT_OK.
+    """
+    # ZUSATZINFO einmalig in Bitmaske übersetzen
+    mask, rest = zusatzinfo.encode(df['ZUSATZINFO'], registry)
+    df[zusatzinfo.MASK_COLUMN] = mask
+    df[zusatzinfo.REST_COLUMN] = rest
+
+    # Einstufung immer vom ursprünglichen Wert aus, damit eine geänderte Konfiguration
+    # (z.B. beim Laden aus dem Datenspeicher) frühere Einstufungen wieder aufheben kann
+    if KONTROLLE_RAW in df.columns:
+        raw = df[KONTROLLE_RAW]
+        df['KONTROLLE'] = raw.where(raw.notna(), df['KONTROLLE'])
+    else:
+        df[KONTROLLE_RAW] = df['KONTROLLE']
+
+    # Verteiler-Zusatzinfos machen aus der Kontrolle ein PERF. NICHT_OK
+    perf_nicht_ok = zusatzinfo.has_any(mask, verteiler_zusatzinfos, registry)
+    df.loc[perf_nicht_ok, 'KONTROLLE'] = 'PERF. NICHT_OK'
+    return df
+
+
+def parse_workbook(name, content, special_column, monthly_columns, registry, verteiler_zusatzinfos):
+    """
+    Liest eine hochgeladene Datei ein und ordnet sie einem Bereich zu.
+
+    Parameters:
+    name (str): Dateiname.
+    content (bytes): Dateiinhalt.
+    special_column (str): Spalte, an der Benchmark-Dateien erkannt werden.
+    monthly_columns (tuple): Spalten, an denen Monatsdateien erkannt werden.
+    registry (tuple): Bekannte Zusatzinfo-Codes für die Bitmaske.
+    verteiler_zusatzinfos (list): Zusatzinfos, die PERF. NICHT_OK auslösen.
+
+    Returns:
+    dict: Ergebnis mit DataFrame, Zuordnung, Laufzeit und ggf. Fehlermeldung.
+    """
+    result = {
+        'name': name,
+        'df': None,
+        'special': False,
+        'monthly': [],
+        'seconds': 0.0,
+        'error': None,
+    }
+    start = time.perf_counter()
+    try:
+        fmt = file_format(name)
+        if fmt is None:
+            result['error'] = f"{name} ist keine Excel-, CSV-, Parquet- oder Feather-Datei!"
+            return result
+
+        # Erst nur die Kopfzeile lesen und die Datei zuordnen
+        columns = sniff_columns(name, content)
+        special, monthly, regular = classify_columns(columns, special_column, monthly_columns)
+        result['special'] = special
+        result['monthly'] = monthly
+
+        if not (regular or special or monthly):
+            result['error'] = f"{name}: Dateityp nicht erkannt (Spalten: {', '.join(col for col in columns[:8] if col)})"
+            return result
+
+        if fmt != 'xlsx':
+            # Spaltenformate direkt über Arrow lesen, ohne Excel-Parser
+            if regular:
+                df = read_columnar(
+                    name,
+                    content,
+                    columns=[col for col in REGULAR_COLUMNS if col in columns],
+                    dtypes={col: t for col, t in REGULAR_DTYPES.items() if col in columns},
+                )
+                df = prepare_regular(df, registry, verteiler_zusatzinfos)
+            else:
+                df = read_columnar(name, content)
+        elif regular and len(content) >= STREAMING_MIN_BYTES:
+            # Sehr große Dateien blockweise lesen
+            df = read_regular_streaming(content, columns, registry, verteiler_zusatzinfos)
+        elif regular:
+            # Nur benötigte Spalten mit festen Typen einlesen
+            df = pd.read_excel(
+                BytesIO(content),
+                usecols=lambda col: col in REGULAR_COLUMNS,
+                dtype={col: t for col, t in REGULAR_DTYPES.items() if col in columns},
+            )
+            df = prepare_regular(df, registry, verteiler_zusatzinfos)
+        else:
+            # Benchmark- und Monatsdateien werden vollständig exportiert/angezeigt
+            df = pd.read_excel(BytesIO(content))
+
+        result['df'] = df
+    except Exception as e:
+        result['error'] = f"{name}: {e}"
+    finally:
+        result['seconds'] = time.perf_counter() - start
+    return result
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _worker_context():
+    # 'forkserver' mit vorab geladenem Modul startet Worker ohne erneuten Import von
+    # pandas/pyarrow; 'fork' scheidet aus, da der Streamlit-Server mehrere Threads hat
+    if 'forkserver' in get_all_start_methods():
+        context = get_context('forkserver')
+        context.set_forkserver_preload([__name__])
+        return context
+    return get_context('spawn')
+
+
+def _get_pool():
+    """
+    Ein gemeinsamer Prozess-Pool für alle Importe (wird bei Bedarf neu erstellt).
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PARALLEL_WORKERS, mp_context=_worker_context())
+        return _pool
+
+
+def _reset_pool(pool):
+    # Nach einem abgestürzten Worker ist der Pool unbrauchbar
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def use_pool(files, parallel=True):
+    """
+    Prozess-Pool nur für mehrere bzw. große Dateien.
+    """
+    if not parallel or PARALLEL_WORKERS < 2 or len(files) < PARALLEL_MIN_FILES:
+        return False
+    return sum(len(content) for _, content in files) >= PARALLEL_MIN_BYTES
+
+
+def parse_workbooks(files, special_column, monthly_columns, registry, verteiler_zusatzinfos, parallel=True):
+    """
+    Liest mehrere Dateien ein, bei Bedarf parallel über einen gemeinsamen Prozess-Pool.
+
+    Parameters:
+    files (list): Liste von (Dateiname, Inhalt)-Tupeln.
+    parallel (bool): Prozess-Pool verwenden, sofern die Dateien groß genug sind (siehe use_pool).
+
+    Returns:
+    list: Ergebnisse von parse_workbook in der Reihenfolge der Eingabe.
+    """
+    args = [(name, content, special_column, monthly_columns, registry, verteiler_zusatzinfos) for name, content in files]
+
+    if not use_pool(files, parallel):
+        return [parse_workbook(*a) for a in args]
+
+    pool = _get_pool()
+    results = [None] * len(args)
+    futures = {pool.submit(parse_workbook, *a): i for i, a in enumerate(args)}
+    for future in as_completed(futures):
+        i = futures[future]
+        try:
+            results[i] = future.result()
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                _reset_pool(pool)
+            # z.B. abgestürzter Worker - Datei als fehlerhaft melden
+            results[i] = {
+                'name': args[i][0],
+                'df': None,
+                'special': False,
+                'monthly': [],
+                'seconds': 0.0,
+                'error': f"{args[i][0]}: {e}",
+            }
+    return results
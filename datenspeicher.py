@@ -0,0 +1,243 @@
+import hashlib
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Lokaler Datenspeicher (SQLite) für alle bisher hochgeladenen Dateien.
+# Neue Uploads werden angehängt, bereits bekannte Dateien (gleicher Inhalt)
+# werden übersprungen. Auswertungen können danach beliebige Zeiträume
+# abfragen, ohne die Originaldateien erneut einzulesen.
+
+DB_PATH = Path(os.environ.get('DATENTOOL_DB', Path.home() / '.local' / 'share' / 'datentool' / 'datentool.sqlite'))
+
+KONTROLLEN_TABLE = 'kontrollen'
+BENCHMARK_TABLE = 'benchmark'
+HASH_COLUMN = 'DATEI_HASH'
+
+KONTROLLEN_INDEXES = ('ERFASST', 'FILIALE', 'ERFASSER')
+
+
+def file_hash(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def monthly_table(col):
+    # Tabellenname je Monatsdatei-Typ, z.B. monat_auszahlbemerkung
+    return f'monat_{col.lower()}'
+
+
+def connect(db_path=None):
+    path = Path(db_path or DB_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute(
+        '''
+        CREATE TABLE IF NOT EXISTS dateien (
+            hash TEXT PRIMARY KEY,
+            name TEXT,
+            typ TEXT,
+            zeilen INTEGER,
+            importiert TEXT
+        )
+        '''
+    )
+    # Ältere Speicher: Zeitraum der Daten nachrüsten (bleibt für alte Dateien leer)
+    columns = _table_columns(conn, 'dateien')
+    for col in ('von', 'bis'):
+        if col not in columns:
+            conn.execute(f'ALTER TABLE dateien ADD COLUMN {col} TEXT')
+    return conn
+
+
+def _table_columns(conn, table):
+    return [row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')]
+
+
+def _append(conn, table, df):
+    """
+    Hängt ein DataFrame an eine Tabelle an und ergänzt fehlende Spalten.
+    """
+    existing = _table_columns(conn, table)
+    if existing:
+        for col in df.columns:
+            if col not in existing:
+                conn.execute(f'ALTER TABLE "{table}" ADD COLUMN "{col}"')
+    df.to_sql(table, conn, if_exists='append', index=False)
+
+
+def data_period(df):
+    """
+    Zeitraum, den die Daten einer Datei abdecken: ERFASST, sonst JAHR/MONAT (ganze Monate).
+
+    Returns:
+    tuple: (von, bis) als 'YYYY-MM-DD' oder (None, None) für Dateien ohne Datum.
+    """
+    if 'ERFASST' in df.columns:
+        erfasst = pd.to_datetime(df['ERFASST'], errors='coerce').dropna()
+        if not erfasst.empty:
+            return erfasst.min().strftime('%Y-%m-%d'), erfasst.max().strftime('%Y-%m-%d')
+
+    if 'JAHR' in df.columns and 'MONAT' in df.columns:
+        monate = (pd.to_numeric(df['JAHR'], errors='coerce') * 12 + pd.to_numeric(df['MONAT'], errors='coerce') - 1).dropna()
+        if not monate.empty:
+            first, last = int(monate.min()), int(monate.max())
+            von = pd.Timestamp(year=first // 12, month=first % 12 + 1, day=1)
+            bis = pd.Timestamp(year=last // 12, month=last % 12 + 1, day=1) + pd.offsets.MonthEnd(0)
+            return von.strftime('%Y-%m-%d'), bis.strftime('%Y-%m-%d')
+
+    return None, None
+
+
+def known_hashes(db_path=None):
+    with closing(connect(db_path)) as conn:
+        return {row[0] for row in conn.execute('SELECT hash FROM dateien')}
+
+
+def append_file(content_hash, name, df, special, monthly, db_path=None):
+    """
+    Speichert eine eingelesene Datei. Bereits gespeicherte Dateien werden übersprungen.
+
+    Returns:
+    bool: True, wenn die Datei neu gespeichert wurde.
+    """
+    with closing(connect(db_path)) as conn, conn:
+        if conn.execute('SELECT 1 FROM dateien WHERE hash = ?', (content_hash,)).fetchone():
+            return False
+
+        df = df.assign(**{HASH_COLUMN: content_hash})
+        if special or monthly:
+            # Wie in load_data: eine Datei kann Benchmark- und Monatsdatei zugleich sein
+            if special:
+                _append(conn, BENCHMARK_TABLE, df)
+            for col in monthly:
+                _append(conn, monthly_table(col), df)
+            typ = ', '.join((['IST'] if special else []) + list(monthly))
+        else:
+            _append(conn, KONTROLLEN_TABLE, df)
+            for col in KONTROLLEN_INDEXES:
+                conn.execute(
+                    f'CREATE INDEX IF NOT EXISTS "idx_{KONTROLLEN_TABLE}_{col}" '
+                    f'ON "{KONTROLLEN_TABLE}" ("{col}")'
+                )
+            typ = 'Kontrollen'
+
+        von, bis = data_period(df)
+        conn.execute(
+            'INSERT INTO dateien (hash, name, typ, zeilen, von, bis, importiert) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (content_hash, name, typ, len(df), von, bis, datetime.now().isoformat(timespec='seconds')),
+        )
+    return True
+
+
+def version(db_path=None):
+    """
+    Ändert sich bei jedem Import - als Cache-Schlüssel für Abfragen.
+    """
+    with closing(connect(db_path)) as conn:
+        count, last = conn.execute('SELECT COUNT(*), MAX(importiert) FROM dateien').fetchone()
+    return f'{count}:{last}'
+
+
+def files(db_path=None):
+    with closing(connect(db_path)) as conn:
+        return pd.read_sql_query('SELECT name, typ, zeilen, von, bis, importiert FROM dateien ORDER BY importiert', conn)
+
+
+def date_range(db_path=None):
+    """
+    Returns:
+    tuple: (erstes, letztes ERFASST) der gespeicherten Kontrollen oder (None, None).
+    """
+    with closing(connect(db_path)) as conn:
+        if not _table_columns(conn, KONTROLLEN_TABLE):
+            return None, None
+        first, last = conn.execute(f'SELECT MIN(ERFASST), MAX(ERFASST) FROM "{KONTROLLEN_TABLE}"').fetchone()
+    if first is None:
+        return None, None
+    return pd.Timestamp(first), pd.Timestamp(last)
+
+
+def load_kontrollen(start_date, end_date, db_path=None):
+    """
+    Kontrollen mit ERFASST im Zeitraum (Enddatum inklusive), über den Index auf ERFASST.
+    """
+    with closing(connect(db_path)) as conn:
+        if not _table_columns(conn, KONTROLLEN_TABLE):
+            return None
+        df = pd.read_sql_query(
+            f'SELECT * FROM "{KONTROLLEN_TABLE}" WHERE ERFASST >= ? AND ERFASST < ?',
+            conn,
+            params=(
+                pd.Timestamp(start_date).strftime('%Y-%m-%d'),
+                (pd.Timestamp(end_date) + timedelta(days=1)).strftime('%Y-%m-%d'),
+            ),
+        )
+    if df.empty:
+        return None
+    df['ERFASST'] = pd.to_datetime(df['ERFASST'], errors='coerce')
+    return df.drop(columns=[HASH_COLUMN])
+
+
+def _load_per_file(conn, table, start_date, end_date):
+    """
+    Dateien ohne ERFASST-Abfrage (Benchmark, Monat), je Datei ein DataFrame.
+
+    Ausgewählt wird nach dem Zeitraum der Daten (von/bis überschneidet den Zeitraum).
+    Wurde eine Datei erneut importiert (gleicher Name, gleicher Zeitraum, anderer Inhalt),
+    zählt nur der letzte Import; verschiedene Dateien desselben Zeitraums bleiben alle erhalten.
+    Dateien ohne Datum in den Daten werden weiterhin nach Importdatum ausgewählt.
+    """
+    if not _table_columns(conn, table):
+        return []
+
+    start = pd.Timestamp(start_date).strftime('%Y-%m-%d')
+    end = pd.Timestamp(end_date).strftime('%Y-%m-%d')
+    end_exclusive = (pd.Timestamp(end_date) + timedelta(days=1)).strftime('%Y-%m-%d')
+
+    dateien = pd.read_sql_query(
+        f'''
+        SELECT hash, name, von, bis, importiert FROM dateien
+        WHERE hash IN (SELECT DISTINCT {HASH_COLUMN} FROM "{table}")
+        ORDER BY von, importiert, rowid
+        ''',
+        conn,
+    )
+    dated = dateien['von'].notna()
+    in_range = np.where(
+        dated,
+        (dateien['von'].fillna('') <= end) & (dateien['bis'].fillna('') >= start),
+        (dateien['importiert'] >= start) & (dateien['importiert'] < end_exclusive),
+    )
+    dateien = dateien[in_range]
+    # Nur echte Neu-Importe ersetzen ältere (z.B. ein korrigiert exportierter Monat)
+    dateien = dateien.drop_duplicates(['name', 'von', 'bis'], keep='last')
+    if dateien.empty:
+        return []
+
+    hashes = dateien['hash'].tolist()
+    placeholders = ', '.join('?' * len(hashes))
+    df = pd.read_sql_query(
+        f'SELECT * FROM "{table}" WHERE {HASH_COLUMN} IN ({placeholders})',
+        conn,
+        params=hashes,
+    )
+    groups = dict(tuple(df.groupby(HASH_COLUMN, sort=False)))
+    return [
+        groups[h].drop(columns=[HASH_COLUMN]).reset_index(drop=True)
+        for h in hashes if h in groups
+    ]
+
+
+def load_special(start_date, end_date, db_path=None):
+    with closing(connect(db_path)) as conn:
+        return _load_per_file(conn, BENCHMARK_TABLE, start_date, end_date)
+
+
+def load_monthly(monthly_columns, start_date, end_date, db_path=None):
+    with closing(connect(db_path)) as conn:
+        return {col: _load_per_file(conn, monthly_table(col), start_date, end_date) for col in monthly_columns}
@@ -0,0 +1,117 @@
+from io import BytesIO
+
+import pandas as pd
+import xlsxwriter
+
+# Excel-Export für große DataFrames.
+# xlsxwriter im constant_memory-Modus schreibt Zeile für Zeile in temporäre
+# Dateien; die Zeilen werden blockweise aus dem DataFrame gelesen. Spaltenbreiten
+# werden aus einer Stichprobe bzw. aus min/max geschätzt statt aus allen Werten.
+
+CHUNK_ROWS = 10_000
+WIDTH_SAMPLE_ROWS = 1_000
+MAX_COLUMN_WIDTH = 100
+
+DATE_FORMAT = 'yyyy-mm-dd hh:mm:ss'  # wie pandas.to_excel
+DATE_WIDTH = 19
+
+
+def estimate_column_widths(df, sample_rows=WIDTH_SAMPLE_ROWS):
+    """
+    Spaltenbreiten (Zeichen) ohne Textkopie der ganzen Daten.
+
+    Zahlen: Länge von Minimum und Maximum. Kategorien: längste Kategorie.
+    Datum: feste Breite. Text: längster Wert einer Stichprobe.
+
+    Returns:
+    list: Breite je Spalte (inkl. Überschrift und 1 Zeichen Reserve).
+    """
+    sample = df if len(df) <= sample_rows else df.sample(sample_rows, random_state=0)
+
+    widths = []
+    for col in df.columns:
+        series = df[col]
+        data_width = 0
+        if len(series) and series.notna().any():
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                data_width = series.cat.categories.astype(str).str.len().max()
+            elif pd.api.types.is_datetime64_any_dtype(series):
+                data_width = DATE_WIDTH
+            elif pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                data_width = max(len(str(series.min())), len(str(series.max())))
+            else:
+                data_width = sample[col].dropna().astype(str).str.len().max()
+                if pd.isna(data_width):
+                    data_width = 0
+        widths.append(min(max(int(data_width), len(str(col))) + 1, MAX_COLUMN_WIDTH))
+    return widths
+
+
+def write_sheet(workbook, df, sheet_name, chunk_rows=CHUNK_ROWS, progress=None, num_formats=None):
+    """
+    Schreibt ein DataFrame zeilenweise in ein neues Arbeitsblatt (Überschrift + Daten, ohne Index).
+    progress(anteil) wird nach jedem Block aufgerufen.
+    """
+    return write_frames(workbook, [df], sheet_name, chunk_rows, progress, num_formats)
+
+
+def write_frames(workbook, frames, sheet_name, chunk_rows=CHUNK_ROWS, progress=None, num_formats=None):
+    """
+    Schreibt mehrere DataFrames untereinander in ein Arbeitsblatt.
+    Die Überschrift ist die Vereinigung aller Spalten (Reihenfolge des ersten Auftretens).
+
+    Parameters:
+    num_formats (dict): Optional, Spalte -> Excel-Zahlenformat (z.B. '#,##0.00').
+    """
+    worksheet = workbook.add_worksheet(sheet_name)
+    header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+
+    columns = list(dict.fromkeys(col for df in frames for col in df.columns))
+    widths = {col: len(str(col)) + 1 for col in columns}
+    for df in frames:
+        for col, width in zip(df.columns, estimate_column_widths(df)):
+            widths[col] = max(widths[col], width)
+
+    num_formats = num_formats or {}
+    for idx, col in enumerate(columns):
+        cell_format = workbook.add_format({'num_format': num_formats[col]}) if col in num_formats else None
+        worksheet.set_column(idx, idx, widths[col], cell_format)
+
+    worksheet.write_row(0, 0, [str(col) for col in columns], header_format)
+
+    # constant_memory: Zeilen strikt in Reihenfolge schreiben
+    total_rows = sum(len(df) for df in frames)
+    row = 1
+    for df in frames:
+        for start in range(0, len(df), chunk_rows):
+            chunk = df.iloc[start:start + chunk_rows].reindex(columns=columns).astype(object)
+            # Fehlende Werte als leere Zellen (wie pandas.to_excel)
+            chunk = chunk.where(chunk.notna(), None)
+            for values in chunk.itertuples(index=False, name=None):
+                worksheet.write_row(row, 0, values)
+                row += 1
+            if progress is not None:
+                progress(row / (total_rows + 1))
+    return worksheet
+
+
+def dataframe_to_xlsx(df, sheet_name='Rohdaten', chunk_rows=CHUNK_ROWS, progress=None):
+    """
+    Exportiert ein DataFrame als Excel-Datei (constant_memory).
+
+    Parameters:
+    df (pandas.DataFrame): Die zu exportierenden Daten.
+    sheet_name (str): Name des Arbeitsblatts.
+    progress (callable): Optional, erhält den Fortschritt (0-1).
+
+    Returns:
+    bytes: Die Excel-Datei.
+    """
+    output = BytesIO()
+    workbook = xlsxwriter.Workbook(output, {
+        'constant_memory': True,
+        'default_date_format': DATE_FORMAT,
+    })
+    write_sheet(workbook, df, sheet_name, chunk_rows, progress)
+    workbook.close()
+    return output.getvalue()
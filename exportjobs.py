@@ -0,0 +1,79 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Downloads werden erst auf Anforderung in einem Hintergrund-Thread erstellt.
+# Fertige Dateien bleiben je Schlüssel (Daten-Fingerabdruck + Filter) erhalten,
+# bis sie von neueren Exporten verdrängt werden.
+
+EXPORT_WORKERS = 2
+EXPORT_ENTRIES = 8
+
+
+class ExportJob:
+    """
+    Ein laufender oder fertiger Export mit Fortschritt (0-1).
+    """
+
+    def __init__(self):
+        self.progress = 0.0
+        self.future = None
+
+    def set_progress(self, value):
+        self.progress = min(max(float(value), 0.0), 1.0)
+
+    def done(self):
+        return self.future.done()
+
+    def result(self):
+        return self.future.result()
+
+    def exception(self):
+        return self.future.exception()
+
+
+class ExportJobs:
+    """
+    Hintergrund-Exporte, begrenzt auf max_entries Ergebnisse (LRU).
+
+    Parameters:
+    max_workers (int): Gleichzeitig laufende Exporte.
+    max_entries (int): Gespeicherte Ergebnisse.
+    """
+
+    def __init__(self, max_workers=EXPORT_WORKERS, max_entries=EXPORT_ENTRIES):
+        self.max_entries = max_entries
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='export')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None:
+                self._jobs.move_to_end(key)
+            return job
+
+    def submit(self, key, build):
+        """
+        Startet build(progress) im Hintergrund, falls für key noch kein Export läuft oder fertig ist.
+        """
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None:
+                return job
+            job = ExportJob()
+            job.future = self._executor.submit(build, job.set_progress)
+            self._jobs[key] = job
+
+            # Älteste fertige Exporte verdrängen; laufende bleiben erhalten
+            for old_key in list(self._jobs):
+                if len(self._jobs) <= self.max_entries:
+                    break
+                if old_key != key and self._jobs[old_key].done():
+                    del self._jobs[old_key]
+            return job
+
+    def discard(self, key):
+        with self._lock:
+            self._jobs.pop(key, None)
@@ -1,152 +1,211 @@
+import hashlib
+import importlib.machinery
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
-from typing import Dict, List
+from typing import Dict, NamedTuple
 import matplotlib.pyplot as plt
 import plotly.graph_objects as go
 import xlsxwriter
-from io import BytesIO
 from datetime import datetime, timedelta
+from datenimport import apply_schema, concat_frames, deduplicate, encode_zusatzinfo, parse_workbooks, DEDUP_KEY, PARSER_VERSION, REGULAR_COLUMNS
+import dateicache
+from exportjobs import ExportJobs
+from excelexport import dataframe_to_xlsx
+from monatsbericht import build_workbook as build_monthly_workbook, euro_text, summarize as summarize_monthly
+from figurcache import FigurCache, figure_key
+import datenspeicher
+import konfiguration
+import tabellenansicht
+import trendanalyse
+from benchmarkdiagramm import benchmark_chart_data, benchmark_overview_data, build_benchmark_figure
+import zusatzinfo
+
+# Die Worker-Prozesse des Datei-Imports (datenimport.parse_workbooks) dürfen diese
+# Datei nicht erneut ausführen. Mit dem Modul-Spec '__main__' lädt multiprocessing
+# das Hauptmodul im Worker nicht nach, dort wird nur datenimport importiert.
+if __name__ == '__main__' and __spec__ is None:
+    __spec__ = importlib.machinery.ModuleSpec('__main__', None)
 
 # Farbdefinitionen
 DARKORANGE1 = "#FF7F00"
 WHITE = "#FFFFFF"
 
-PERFORMANCE_ZUSATZINFOS = [
-                        'OK',
-                        'SOMMERGARTEN',
-                        'NACHGEFRAGT',
-                        'LETZTER_STOCK',
-                        'SACKGASSE',
-                        'FALSCHE_ABGABESTELLE',
-                        'NICHT_GANZ_IN_ABGABESTELLE',
-                        'SENDUNG_BESCHAEDIGT',
-                        'IN_EU_HBFA_VERTEILT',
-                        'IN_ZEITUNGSROLLE_VERTEILT',
-                        'WERBEVERZICHT_UEBERSEHEN',
-                        'PROSPEKTE_FEHLEN',
-                        'PROSPEKTE_MEHRFACH',
-                        'PROSPEKTE_EINGELEGT',
-                        'PROSPEKTE_ZU_FRUEH_VERTEILT',
-                        'PROSPEKTE_ZU_SPAET_VERTEILT',
-                        'PROSPEKTE_NICHT_BEAUFTRAGT',
-                        'LETZTES_STOCKWERK_AUSGELASSEN',
-                        'STOCKWERK_AUSGELASSEN',
-                        'HBFA_FAECHER_AUSGELASSEN',
-                    ]
-
-VERTEILER_ZUSATZINFOS = [
-                        'FALSCHE_ABGABESTELLE',
-                        'NICHT_GANZ_IN_ABGABESTELLE',
-                        'SENDUNG_BESCHAEDIGT',
-                        'IN_EU_HBFA_VERTEILT',
-                        'IN_ZEITUNGSROLLE_VERTEILT',
-                        'WERBEVERZICHT_UEBERSEHEN',
-                        'PROSPEKTE_FEHLEN',
-                        'PROSPEKTE_MEHRFACH',
-                        'PROSPEKTE_EINGELEGT',
-                        'PROSPEKTE_ZU_FRUEH_VERTEILT',
-                        'PROSPEKTE_ZU_SPAET_VERTEILT',
-                        'PROSPEKTE_NICHT_BEAUFTRAGT',
-                        'LETZTES_STOCKWERK_AUSGELASSEN',
-                        'STOCKWERK_AUSGELASSEN',
-                        'HBFA_FAECHER_AUSGELASSEN',
-                    ]
-
-
-INCLUDE_ZUSATZINFOS = [
-                    'BG_SCHLOSS_DEFEKT',
-                    'Z_SCHLOSS_DEFEKT',
-                    'VERTEILER_NICHT_BEGONNEN',
-                    'HBFA_NICHT_EINSEHBAR',
-                    'KEIN_ZUTRITT_MOEGLICH',
-                    'ANSCHRIFT_UNGENUEGEND',
-                    'ABGABESTELLE_UNZUREICHEND_BESCHRIFTET',
-                    'KEINE_ABGABESTELLE',
-                    'ALTES_PROSPEKT_NICHT_ENTFERNT',
-                    'ABGABESTELLE_UEBERFUELLT',
-                    'ZUSTELLHINDERNIS',
-                    'ABGABESTELLE_LEER',
-                    'ADRESSEN_NICHT_ZUGESTELLT',
-                    'EU_HBFA',
-                    'EMPFAENGER_UNBEKANNT',
-                    'ZEITUNGSROLLE',
-                    'KEIN_BG_Z_SCHLOSS',
-                    'FALSCH_VERTEILT',
-                    'ZUTRITT_NUR_DURCH_ANLAEUTEN_MOEGLICH',
-                    'WURF_BESCHAEDIGT',
-                    'TUEREINWURF',
-                    'PROSPEKTE_NICHT_BEAUFTRAGT',
-                    'PROSPEKTE_EINGELEGT',
-                    'IN_EU_HBFA_VERTEILT',
-                    'NOTES_TUERHAENGER',
-                    'SACKERL_NICHT_VERWENDET',
-                ]
-# Funktion zum Laden der Daten (XLSX)
-@st.cache_data
-def load_data(files, special_column, monthly_columns):
+# Konfiguration (Zusatzinfo-Listen, Filialen, Benchmark-Roster) aus konfiguration.json.
+# Änderungen an der Datei werden beim nächsten Rerun ohne Neustart übernommen;
+# nur Caches, die vom geänderten Abschnitt abhängen, werden neu berechnet.
+@st.cache_resource(max_entries=4)
+def load_konfiguration(path, mtime_ns):
+    # mtime_ns ist nur Cache-Schlüssel
+    return konfiguration.load(path)
+
+
+@st.cache_resource
+def last_konfiguration():
+    # Zuletzt gültige Konfiguration, falls eine Änderung fehlerhaft ist
+    return {}
+
+
+def current_konfiguration():
+    """
+    Returns:
+    tuple: (Konfiguration, Fehlermeldung oder None). Beim Start muss die Datei gültig sein.
+    """
+    last = last_konfiguration()
+    try:
+        konfig = load_konfiguration(str(konfiguration.CONFIG_PATH), konfiguration.CONFIG_PATH.stat().st_mtime_ns)
+    except (OSError, ValueError) as e:
+        if 'konfig' not in last:
+            raise
+        return last['konfig'], str(e)
+    last['konfig'] = konfig
+    return konfig, None
+
+
+KONFIG, KONFIG_FEHLER = current_konfiguration()
+
+PERFORMANCE_ZUSATZINFOS = KONFIG.performance_zusatzinfos
+VERTEILER_ZUSATZINFOS = KONFIG.verteiler_zusatzinfos
+INCLUDE_ZUSATZINFOS = KONFIG.include_zusatzinfos
+# Infos, die in der Performance-Auswertung entfernt werden
+REMOVED_ZUSATZINFOS = KONFIG.removed_zusatzinfos
+# Registry aller bekannten Zusatzinfos (Position = Bit in ZUSATZINFO_MASK)
+ZUSATZINFO_REGISTRY = KONFIG.registry
+
+# Funktion zum Laden der Daten (XLSX, CSV, Parquet, Feather)
+# cache_resource: alle Reruns teilen sich dieselben DataFrames ohne Kopie.
+# Die Rückgabewerte dürfen deshalb nicht in-place verändert werden.
+@st.cache_resource(max_entries=2)
+def load_data(files, special_column, monthly_columns, parallel=True, use_cache=True, cache_limit_mb=dateicache.CACHE_LIMIT_MB, store=False, dedup_key=DEDUP_KEY, zusatzinfo_version=None):
+    # zusatzinfo_version ist nur Cache-Schlüssel (Abschnitt 'zusatzinfos' der Konfiguration)
     regular_dataframes = []
     special_dataframes = []
     # Dictionary für die verschiedenen monthly DataFrames
     monthly_dataframes_dict = {col: [] for col in monthly_columns}
-    
-    for file in files:
-        try:
-            if file.name.endswith(('.xlsx', '.XLSX')):
-                df = pd.read_excel(file)
-                
-                # Überprüfen, ob die Spalte vorhanden ist
-                if special_column in df.columns:
-                    special_dataframes.append(df)
-
-                # Überprüfen für jede Spalte
-                monthly_found = False
-                for col in monthly_columns:
-                    if col in df.columns:
-                        monthly_dataframes_dict[col].append(df)
-                        monthly_found = True
-
-                # Nur wenn keine monatliche Spalte gefunden wurde, als reguläres DataFrame behandeln
-                if not monthly_found and special_column not in df.columns:
-                    # Debugging-Ausgabe für Spaltennamen
-                    
-                    # Konvertiere die 'ERFASST' Spalte in datetime
-                    if 'ERFASST' in df.columns:
-                        df['ERFASST'] = pd.to_datetime(df['ERFASST'], format='%d.%m.%Y %H:%M:%S', errors='coerce')
-                    else:
-                        ' '
-                    
-                    if 'GEBIET' in df.columns:
-                        df['PLZ'] = df['GEBIET'].str[:4]
-                    else:
-                         ' '
-                    
-                    if 'FILIALE' in df.columns:
-                        df = df[df['FILIALE'] != 'Fil12']
-                    else:
-                        ' '
-                    
-                    def check_zusatzinfo(row):
-                        if pd.isna(row['ZUSATZINFO']):
-                            return row['KONTROLLE']
-                        
-                        zusatzinfos = str(row['ZUSATZINFO']).split()
-                        if any(info in VERTEILER_ZUSATZINFOS for info in zusatzinfos):
-                            return 'PERF. NICHT_OK'
-                        return row['KONTROLLE']
-                    
-                    df['KONTROLLE'] = df.apply(check_zusatzinfo, axis=1)
-                    
-                    regular_dataframes.append(df)
-            else:
-                st.error(f"{file.name} ist keine Excel-Datei!")
-        except Exception as e:
-            ' '
-    
+
+    contents = [(file.name, file.getvalue()) for file in files]
+    results = [None] * len(contents)
+    keys = [None] * len(contents)
+
+    # Bereits bekannte Dateien aus dem Cache holen
+    if use_cache:
+        for i, (name, content) in enumerate(contents):
+            keys[i] = dateicache.content_key(content, PARSER_VERSION, special_column, monthly_columns, ZUSATZINFO_REGISTRY, VERTEILER_ZUSATZINFOS)
+            cached = dateicache.get(keys[i])
+            if cached is not None:
+                df, meta = cached
+                results[i] = {
+                    'name': name,
+                    'df': df,
+                    'special': meta['special'],
+                    'monthly': meta['monthly'],
+                    'seconds': 0.0,
+                    'error': None,
+                    'cached': True,
+                }
+
+    # Restliche Dateien (parallel) einlesen und vorverarbeiten
+    missing = [i for i, result in enumerate(results) if result is None]
+    parsed = parse_workbooks(
+        [contents[i] for i in missing],
+        special_column,
+        monthly_columns,
+        ZUSATZINFO_REGISTRY,
+        VERTEILER_ZUSATZINFOS,
+        parallel=parallel,
+    )
+    for i, result in zip(missing, parsed):
+        result['cached'] = False
+        results[i] = result
+        if use_cache and result['df'] is not None:
+            dateicache.put(
+                keys[i],
+                result['df'],
+                {'special': result['special'], 'monthly': result['monthly']},
+                limit_mb=cache_limit_mb,
+            )
+
+    import_report = []
+    regular_report_rows = []
+    for (_, content), result in zip(contents, results):
+        df = result['df']
+
+        # Neue Dateien im lokalen Datenspeicher ablegen (bekannte werden übersprungen)
+        stored = False
+        if store and df is not None:
+            stored = datenspeicher.append_file(
+                datenspeicher.file_hash(content), result['name'], df, result['special'], result['monthly']
+            )
+        if df is not None:
+            if result['special']:
+                special_dataframes.append(df)
+
+            for col in result['monthly']:
+                monthly_dataframes_dict[col].append(df)
+
+            # Nur wenn keine monatliche Spalte gefunden wurde, als reguläres DataFrame behandeln
+            if not result['monthly'] and not result['special']:
+                regular_dataframes.append(df)
+                regular_report_rows.append(len(import_report))
+
+        if result['error']:
+            typ = 'Fehler'
+        elif result['special']:
+            typ = special_column
+        elif result['monthly']:
+            typ = ', '.join(result['monthly'])
+        else:
+            typ = 'Kontrollen'
+
+        import_report.append({
+            'Datei': result['name'],
+            'Typ': typ,
+            'Zeilen': len(df) if df is not None else 0,
+            'Sekunden': round(result['seconds'], 2),
+            'Cache': result['cached'],
+            'Gespeichert': stored,
+            'Duplikate': 0,
+            'Fehler': result['error'] or '',
+        })
+
+    # Doppelte Kontrollen aus überlappenden Exporten entfernen
+    regular_dataframes, removed = deduplicate(regular_dataframes, dedup_key)
+    for row, df, count in zip(regular_report_rows, regular_dataframes, removed):
+        import_report[row]['Zeilen'] = len(df)
+        import_report[row]['Duplikate'] = count
+
     # Zusammenführen der regulären DataFrames
-    regular_df = pd.concat(regular_dataframes, ignore_index=True) if regular_dataframes else None
-    
-    return regular_df, special_dataframes, monthly_dataframes_dict
+    regular_df = concat_frames(regular_dataframes) if regular_dataframes else None
+
+    # Textspalten als Kategorien ablegen
+    memory_report = None
+    if regular_df is not None:
+        regular_df, memory_report = apply_schema(regular_df)
+
+    return regular_df, special_dataframes, monthly_dataframes_dict, pd.DataFrame(import_report), memory_report
+
+
+@st.cache_resource(max_entries=2)
+def load_store_data(start_date, end_date, monthly_columns, store_version, dedup_key=DEDUP_KEY, zusatzinfo_version=None):
+    """
+    Lädt einen Zeitraum aus dem lokalen Datenspeicher statt aus Uploads.
+    Liefert dieselben Werte wie load_data; store_version und zusatzinfo_version sind nur Cache-Schlüssel.
+    """
+    regular_df = datenspeicher.load_kontrollen(start_date, end_date)
+    if regular_df is not None:
+        # Maske und PERF. NICHT_OK-Einstufung (aus KONTROLLE_ROH) mit der aktuellen Konfiguration neu aufbauen
+        regular_df = encode_zusatzinfo(regular_df, ZUSATZINFO_REGISTRY, VERTEILER_ZUSATZINFOS)
+        # Gespeicherte Dateien können sich überlappen
+        (regular_df,), _ = deduplicate([regular_df], dedup_key)
+    special_dataframes = datenspeicher.load_special(start_date, end_date)
+    monthly_dataframes_dict = datenspeicher.load_monthly(monthly_columns, start_date, end_date)
+
+    memory_report = None
+    if regular_df is not None:
+        regular_df, memory_report = apply_schema(regular_df)
+
+    return regular_df, special_dataframes, monthly_dataframes_dict, datenspeicher.files(), memory_report
 
 
 
@@ -170,25 +229,7 @@ def preprocess_data_zusatzinfos(df):
 
 # Neue Funktion speziell für Verteilerperformance
 def preprocess_data_verteilerperformance(df):
-    # Liste der erlaubten Zusatzinfos für Verteilerperformance
-    VERTEILER_ZUSATZINFOS = [
-        'FALSCHE_ABGABESTELLE',
-        'NICHT_GANZ_IN_ABGABESTELLE',
-        'SENDUNG_BESCHAEDIGT',
-        'IN_EU_HBFA_VERTEILT',
-        'IN_ZEITUNGSROLLE_VERTEILT',
-        'WERBEVERZICHT_UEBERSEHEN',
-        'PROSPEKTE_FEHLEN',
-        'PROSPEKTE_MEHRFACH',
-        'PROSPEKTE_EINGELEGT',
-        'PROSPEKTE_ZU_FRUEH_VERTEILT',
-        'PROSPEKTE_ZU_SPAET_VERTEILT',
-        'PROSPEKTE_NICHT_BEAUFTRAGT',
-        'LETZTES_STOCKWERK_AUSGELASSEN',
-        'STOCKWERK_AUSGELASSEN',
-        'HBFA_FAECHER_AUSGELASSEN',
-    ]
-    
+    # Erlaubte Zusatzinfos für Verteilerperformance: VERTEILER_ZUSATZINFOS (Konfiguration)
     df['NAME/VT/ABNEHMER'] = df['NAME/VT/ABNEHMER'].replace('', None).fillna('Verteiler unbekannt')
     type_counts = df['TYPE'].value_counts()
     df['PLZ'] = df['GEBIET'].str[:4]
@@ -208,152 +249,639 @@ def preprocess_data_verteilerperformance(df):
 
 
 def aktualisierte_fil(df):
-
-    # Dictionary mit PLZ-Mapping für alle Filialen
-    filial_mapping = {
-        'Fil01': [1070, 1080, 1090, 1150, 1160, 1170, 1180, 1190, 1200],
-        
-        'Fil02': [1050, 1130, 1140, 1230],
-        
-        'Fil03': [1040, 1060, 1100, 1110, 1120],
-        
-        'Fil05': [1010, 1020, 1030, 1210, 1220],
-        
-        'Fil06': [6020],
-        
-        'Fil07': [3071, 3100, 3104, 3105, 3107, 3110, 3121, 3123, 3124, 3125, 
-                 3130, 3131, 3133, 3134, 3140, 3141, 3142, 3143, 3150, 3151, 3200, 
-                 3205, 3384, 3385, 3388],
-        
-        'Fil08': [1300, 2320, 2322, 2325, 2326, 2331, 2333, 2334, 2340, 2344, 
-                 2345, 2351, 2352, 2353, 2361, 2362, 2371, 2372, 2380, 2381, 
-                 2384, 2391, 2401, 2402, 2403, 2404, 2405, 2410, 2412, 2413, 
-                 2431, 2432, 2433, 2434, 2435, 2440, 2441, 2442, 2443, 2444, 
-                 2451, 2452, 2453, 2454, 2460, 2462, 2463, 2464, 2465, 2471, 
-                 2472, 2481, 2482, 2483, 2485, 2486, 2491, 2531, 2532, 7000, 
-                 7011, 7012, 7013, 7034, 7035, 7041, 7042, 7051, 7052, 7061, 
-                 7062, 7063, 7064, 7071, 7072, 7081, 7082, 7083, 7091],
-        
-        'Fil09': [4020, 4030, 4040, 4048, 4050, 4052, 4053, 4055, 4060, 4061, 
-                 4063, 4073, 4600, 4614],
-        
-        'Fil10': [8010, 8020, 8036, 8041, 8042, 8043, 8044, 8045, 8046, 8047, 
-                 8051, 8052, 8053, 8054, 8055],
-        
-        'Fil13': [2504, 2511, 2512, 2514, 2521, 2522, 2523, 2524, 2525, 2540, 2542, 
-                 2544, 2551, 2552, 2602, 2700, 7020, 7021, 7022, 7023, 7024, 
-                 7025, 7031, 7032, 7033, 7201, 7202, 7203, 7210, 7212, 7221, 
-                 7222, 7223],
-        
-        'Fil15': [5020, 5026]
-    }
-    
     try:
-        # Konvertiere PLZ zu Integer, mit Fehlerbehandlung
-        df['PLZ'] = pd.to_numeric(df['PLZ'], errors='coerce')
-        
-        # Neue Spalte mit bestehenden Filialwerten
-        neue_filialen = df['FILIALE'].copy()
-        
-        # Aktualisiere Filialen basierend auf PLZ-Mapping
-        for filiale, plz_list in filial_mapping.items():
-            # Maske für alle PLZs die zur aktuellen Filiale gehören
-            maske = df['PLZ'].isin(plz_list)
-            # Update nur die Zeilen wo die PLZ matched
-            neue_filialen.loc[maske] = filiale
-            
-        return neue_filialen
-        
+        # Aktualisiere Filialen basierend auf PLZ-Mapping (ein Zugriff auf die Lookup-Tabelle,
+        # gültige Mapping-Version je ERFASST)
+        return FILIAL_ZUORDNUNG.by_plz(df['PLZ'], df['ERFASST'], df['FILIALE'])
+
     except Exception as e:
         print(f"Fehler bei der Filialzuordnung: {str(e)}")
         return df['FILIALE']  # Im Fehlerfall original Werte zurückgeben
     
 
-def get_target_value(name: str, target_values: Dict[int, List[str]]) -> int:
-    for value, names in target_values.items():
-        if name in names:
-            return value
-    return 0
+def build_roster(fixed_branches: Dict[str, str], target_values: Dict[str, int]) -> pd.DataFrame:
+    """
+    Roster-Tabelle für den Benchmark: ein Eintrag je Gebietsbetreuer.
+
+    Parameters:
+    fixed_branches (dict): Name -> feste Filiale (aus der Konfiguration)
+    target_values (dict): Name -> Soll-Wert (fehlende Namen: 0)
+
+    Returns:
+    pandas.DataFrame: Spalten FILIALE, ERFASSER, SOLL WERT in Reihenfolge von fixed_branches
+    """
+    roster = pd.DataFrame({
+        'FILIALE': list(fixed_branches.values()),
+        'ERFASSER': list(fixed_branches.keys()),
+    })
+    roster['SOLL WERT'] = roster['ERFASSER'].map(target_values).fillna(0).astype(np.int64)
+    return roster
+
 
 def process_data(special_dataframes, fixed_branches, target_values, names_to_remove):
+    roster = build_roster(fixed_branches, target_values)
+    fixed_of = pd.Series(roster['FILIALE'].to_numpy(), index=roster['ERFASSER'])
+
     processed_data = []
     for special_df in special_dataframes:
         special_df = special_df[~special_df['ERFASSER'].isin(names_to_remove)]
 
         # Fill in missing 'SOLL WERT' with 0
-        special_df['SOLL WERT'].fillna(0, inplace=True)
-
-        # Remove fixed 'SOLL WERT' values from rows that don't match the fixed branch
-        for branch, names in fixed_branches.items():
-            for name in names:
-                mask = (special_df['ERFASSER'] == name)
-                if mask.sum() > 1:
-                    indices_to_keep = mask & (special_df['FILIALE'] == branch)
-                    indices_to_remove = mask & ~indices_to_keep
-                    special_df.loc[indices_to_remove, 'SOLL WERT'] = 0
-
-                if (mask.sum() == 1 and not any(special_df.loc[mask, 'FILIALE'] == branch)) or mask.sum() == 0:
-                    new_entry = pd.DataFrame({
-                        'FILIALE': [branch],
-                        'ERFASSER': [name],
-                        'SOLL WERT': [get_target_value(name, target_values)]
-                    })
-                    special_df = pd.concat([special_df, new_entry], ignore_index=True)
+        special_df = special_df.assign(**{'SOLL WERT': special_df['SOLL WERT'].fillna(0)})
 
-        # Fill in missing values with 0
-        special_df.fillna(0, inplace=True)
-
-        special_df['%Änderung'] = (special_df['IST'] / special_df['SOLL WERT']) * 100
-        special_df['%Änderung'] = special_df['%Änderung'].map(lambda x: f"{x:.2f}%")
+        # Feste Filiale und Anzahl Zeilen je Erfasser (ein Join statt einer Maske je Name)
+        fixed = special_df['ERFASSER'].map(fixed_of).to_numpy(dtype=object)
+        rows_per_name = special_df['ERFASSER'].value_counts()
+        n_rows = special_df['ERFASSER'].map(rows_per_name).to_numpy()
+        at_fixed = special_df['FILIALE'].to_numpy(dtype=object) == fixed
 
-        special_df['100%']= 100
-        special_df['100%'] = special_df['100%'].map(lambda x: f"{x:.2f}%")
+        # Remove fixed 'SOLL WERT' values from rows that don't match the fixed branch
+        wrong_branch = pd.notna(fixed) & (n_rows > 1) & ~at_fixed
+        special_df['SOLL WERT'] = special_df['SOLL WERT'].mask(wrong_branch, 0)
 
+        # Anti-Join: Gebietsbetreuer ohne Zeile (oder mit genau einer Zeile in fremder Filiale) ergänzen
+        roster_rows = roster['ERFASSER'].map(rows_per_name).fillna(0).to_numpy()
+        roster_at_fixed = roster['ERFASSER'].isin(special_df.loc[at_fixed, 'ERFASSER']).to_numpy()
+        missing = roster[(roster_rows == 0) | ((roster_rows == 1) & ~roster_at_fixed)]
+        if not missing.empty:
+            special_df = pd.concat([special_df, missing], ignore_index=True)
 
+        # Fill in missing values with 0
+        special_df = special_df.fillna(0)
 
-        special_df['⌀Kontrollen'] = (special_df['IST'] / 16)
-        special_df['⌀Kontrollen'] = special_df['⌀Kontrollen'].map(lambda x: f"{x:.0f}")
+        special_df['%Änderung'] = np.char.mod('%.2f%%', (special_df['IST'] / special_df['SOLL WERT'] * 100).to_numpy(dtype=float))
+        special_df['100%'] = f"{100:.2f}%"
+        special_df['⌀Kontrollen'] = np.char.mod('%.0f', (special_df['IST'] / 16).to_numpy(dtype=float))
 
         special_df['DIFF'] = special_df['IST'] - special_df['SOLL WERT']
         processed_data.append(special_df)
-        
 
-        
     return pd.concat(processed_data, ignore_index=True)
 
     
 
 
-AKTUALISIERTE_GB = {
-        'Fil01' : ['AKRAP Ivica', 'FRATRIK Anton', 'JURACKA MIROSLAV', 'KUBES PAVEL', 'NAGY ZSOLT', 'ÖZTÜRK TOLGA', 'PALAGIC SORIN-MIRCEA', 'VIASZ-KADI IMRE'],
-        'Fil02' : ['HINTERWALLNER PATRICK', 'IZER PETER', 'KLARIC SASA', 'Lastro Marko', 'MORAR Catalin', 'SALA STANISLAV'],
-        'Fil03' : ['AMBRUS DOREL', 'BATISTA ', 'DANIHEL Norbert', 'GHOTRA GURVINDER SINGH', 'LAPOSA MIKLOS', 'MAYER ', 'RISTIC ', 'TOTH ', 'VIRAG ADAM'] ,
-        'Fil05' : ['ADAMOVIC LUBOMIR', 'KAJDIC Muhamed', 'KRUK Maciej', 'LOBODAS MAREK', 'Lubinski Stanislaw', 'PETRANEK IVAN', 'RACZ LASZLO BALINT'] ,
-        'Fil06' : ['MÜLLNER MARIO', 'PAYR FLORIAN', 'Vergeiner Fabian'],
-        'Fil07' : ['HABERL GERALD', 'JOZSA ROLAND', 'SEBÖK ROBERT', 'STAUDINGER FRIEDRICH'] ,
-        'Fil08' : ['Klavik Kurt', 'LIPKA ZOLTAN', 'NIEFERGALL GERALD', 'Saibl Klaus', 'SCHÖPF OTMAR', 'STEIDL ANDREAS', 'Weidinger Christian'] ,
-        'Fil09' : ['DUSEK Petr', 'HUMER Sven Sebastian', 'IVANIC Roman', 'KOBIDA ROMAN', 'NAIRZ MICHAEL', 'PODMAJERSKY Viktor', 'REICH Roland', 'SIMKO RADEK', 'VYBOH Jaroslav', 'WEIDINGER THOMAS', 'WINKLER Christian', 'ZSAKOVICS Adrian'] ,
-        'Fil10' : ['BOGAR ADAM', 'GALAVITS PATRIK', 'KÄFFER Dietmar', 'Neger Helmut', 'VIDA ÁDÁM'] ,
-        'Fil13' : ['GAZICA Ivica', 'KARL ELISABETH', 'KLAMBAUER Erwin', 'KONDOR', 'REBEKIC Vlatko', 'SZUPPIN Bianca', 'VARGA ARPAD'] ,
-        'Fil15' : ['PICHLER Maximilian', 'RISTIC Sretko', 'ZICKBAUER Gerald', 'BAYER SIEGFRIED']  
-        }
-ERFASSER_FILIALE_MAPPING = {
-        gb : filiale
-        for filiale, gb_liste in AKTUALISIERTE_GB.items()
-        for gb in gb_liste
-    }
-    
+# Filialzuordnung (PLZ und Gebietsbetreuer, mit Stichtagen) und Filialen für die Filter
+FILIAL_ZUORDNUNG = KONFIG.filial_zuordnung
+FILIAL_WHITELIST = KONFIG.filial_whitelist
+
 def apply_fixed_filiale(df):
-    # Neue Spalte erstellen mit den festen Filialen-Zuordnungen
-    df['FILIALE'] = df['ERFASSER'].map(ERFASSER_FILIALE_MAPPING)
+    # Neue Spalte erstellen mit den festen Filialen-Zuordnungen (gültige Version je ERFASST)
+    df['FILIALE'] = FILIAL_ZUORDNUNG.by_erfasser(df['ERFASSER'], df['ERFASST'])
 
     return df
+
+
+def upload_fingerprint(files):
+    """
+    Fingerabdruck über alle hochgeladenen Dateien (Inhalt, Reihenfolge egal).
+    """
+    hashes = sorted(hashlib.sha256(file.getvalue()).hexdigest() for file in files)
+    return hashlib.sha256('|'.join(hashes).encode()).hexdigest()
+
+
+def config_version(*objects):
+    """
+    Kurzer Hash über Zuordnungen/Listen - ändert sich, sobald sich der Inhalt ändert.
+    """
+    return hashlib.sha256(repr(objects).encode()).hexdigest()[:12]
+
+
+# Version der Zuordnungen, die in die Performance-Aufbereitung einfließen
+MAPPING_VERSION = config_version(KONFIG.versions['filialen'], KONFIG.versions['zusatzinfos'])
+
+
+# Pipeline-Stufen
+# Jede Stufe ist über den Upload-Fingerabdruck und die Version ihrer
+# Zuordnungen gecacht. DataFrames mit führendem '_' werden nicht gehasht.
+# Ergebnisse sind geteilt (cache_resource) und dürfen nicht verändert werden.
+
+class PerformanceDaten(NamedTuple):
+    df: pd.DataFrame  # nach ERFASST sortiert
+    min_date: pd.Timestamp
+    max_date: pd.Timestamp
+    filialen: list
+    types: list
+    erfasst: np.ndarray  # ERFASST als datetime64 für die Binärsuche
+    day_index: dict  # Tag -> (erste Zeile, letzte Zeile + 1)
+
+
+def day_partitions(erfasst):
+    """
+    Zeilenbereiche je Tag für ein nach ERFASST sortiertes datetime64-Array (NaT am Ende).
+    """
+    days = erfasst[~np.isnat(erfasst)].astype('datetime64[D]')
+    if len(days) == 0:
+        return {}
+    starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+    ends = np.r_[starts[1:], len(days)]
+    return {pd.Timestamp(days[i]).date(): (int(i), int(j)) for i, j in zip(starts, ends)}
+
+
+def date_slice(performance, start_date, end_date):
+    """
+    Zeilen mit ERFASST zwischen start_date und end_date (inklusive) als Ausschnitt
+    der sortierten Daten - Einzeltage direkt aus dem Tagesindex, sonst per Binärsuche.
+    """
+    if start_date == end_date and start_date in performance.day_index:
+        lo, hi = performance.day_index[start_date]
+    else:
+        lo, hi = np.searchsorted(
+            performance.erfasst,
+            [np.datetime64(pd.Timestamp(start_date)), np.datetime64(pd.Timestamp(end_date) + timedelta(days=1))],
+            side='left',
+        )
+    return performance.df.iloc[lo:hi]
+
+
+@st.cache_resource(max_entries=4)
+def prepare_performance_data(_regular_df, fingerprint, mapping_version):
+    """
+    Stufe 'Performance': Zusatzinfos bereinigen, feste Filialen zuordnen,
+    Datumsbereich und Filteroptionen bestimmen.
+    """
+    # Flache Kopie: neue Spalten ersetzen nur in der Kopie, die geladenen Daten bleiben unverändert
+    df = _regular_df.copy(deep=False)
+
+    # Zu löschende Zusatzinfos aus der Bitmaske entfernen
+    df[zusatzinfo.MASK_COLUMN] = zusatzinfo.remove(
+        df[zusatzinfo.MASK_COLUMN], REMOVED_ZUSATZINFOS, ZUSATZINFO_REGISTRY
+    )
+    df[zusatzinfo.REST_COLUMN] = zusatzinfo.remove_rest(df[zusatzinfo.REST_COLUMN], REMOVED_ZUSATZINFOS)
+
+    # Aktualisiere die Filialzuordnung basierend auf den festen Gebietsbetreuern
+    df = apply_fixed_filiale(df)
+    df['FILIALE'] = df['FILIALE'].astype('category')
+
+    filialen = sorted(df.loc[df['FILIALE'].isin(FILIAL_WHITELIST), 'FILIALE'].unique())
+    types = sorted(df['TYPE'].dropna().unique())
+
+    # Nach ERFASST sortieren, damit Zeiträume als Ausschnitt gelesen werden können
+    df = df.sort_values('ERFASST', kind='stable', na_position='last', ignore_index=True)
+    erfasst = df['ERFASST'].to_numpy(dtype='datetime64[ns]')
+
+    return PerformanceDaten(
+        df, df['ERFASST'].min(), df['ERFASST'].max(), filialen, types, erfasst, day_partitions(erfasst)
+    )
+
+
+@st.cache_resource(max_entries=4)
+def prepare_benchmark_data(_special_dataframes, fingerprint, _konfig, benchmark_version):
+    """
+    Stufe 'Benchmark': IST/SOLL je Erfasser (process_data).
+    Schlüssel ist die Version des Benchmark-Abschnitts der Konfiguration.
+    """
+    return process_data(_special_dataframes, _konfig.fixed_branches, _konfig.target_values, _konfig.names_to_remove)
+
+
+@st.cache_resource(max_entries=4)
+def prepare_monthly_summary(_monthly_dfs, fingerprint):
+    """
+    Stufe 'Monatsbericht': Übersichten aller Monatsdateien, einmal je Upload.
+    """
+    return summarize_monthly(_monthly_dfs)
+
+
+# Schlüssel des Kontroll-Würfels für die Performance-Ansicht
+CUBE_KEYS = ['TAG', 'FILIALE', 'ERFASSER', 'NAME/VT/ABNEHMER', 'TYPE', 'KONTROLLE']
+
+
+@st.cache_resource(max_entries=4)
+def build_kontroll_cube(_df, fingerprint, mapping_version):
+    """
+    Stufe 'Würfel': Zählt die Kontrollen einmal je Tag, Filiale, Erfasser, Zusteller, Type und Ergebnis.
+    Alle Filter der Performance-Ansicht werden danach nur noch auf diesem Würfel gerechnet.
+
+    Parameters:
+    _df (pandas.DataFrame): Aufbereitete Kontrolldaten (wird nicht gehasht).
+    fingerprint (str): Fingerabdruck des Uploads als Cache-Schlüssel.
+    mapping_version (str): Version der Filialzuordnung.
+    """
+    cube = _df.assign(TAG=_df['ERFASST'].dt.normalize())
+    cube = cube.groupby(CUBE_KEYS, dropna=False, observed=True).size().reset_index(name='ANZAHL')
+    return cube
+
+
+def slice_cube(cube, start_date, end_date, filialen=None, types=None, kontrollen=None):
+    """
+    Schneidet den Würfel auf Zeitraum und Filter zu. Der Würfel ist nach TAG sortiert,
+    der Zeitraum wird deshalb per Binärsuche ausgeschnitten.
+    """
+    tag = cube['TAG'].to_numpy(dtype='datetime64[ns]')
+    lo = np.searchsorted(tag, np.datetime64(pd.Timestamp(start_date)), side='left')
+    hi = np.searchsorted(tag, np.datetime64(pd.Timestamp(end_date)), side='right')
+    cube = cube.iloc[lo:hi]
+
+    mask = np.ones(len(cube), dtype=bool)
+    if filialen:
+        mask &= cube['FILIALE'].isin(filialen).to_numpy()
+    if types:
+        mask &= cube['TYPE'].isin(types).to_numpy()
+    if kontrollen:
+        mask &= cube['KONTROLLE'].isin(kontrollen).to_numpy()
+    return cube[mask]
+
+
+def cube_group_stats(cube_slice, group_by_field):
+    """
+    Kontrollergebnisse je Gruppe (entspricht groupby([feld, 'KONTROLLE']).size().unstack()).
+    """
+    stats = (
+        cube_slice.groupby([group_by_field, 'KONTROLLE'], observed=True)['ANZAHL']
+        .sum()
+        .unstack(fill_value=0)
+    )
+    # Kategorische Spaltenköpfe in normale Spaltennamen umwandeln
+    stats.columns = stats.columns.astype(object)
+    return stats
+
+
+def label_cube(cube_slice, view_type):
+    """
+    Spalte der Einträge je Ansicht; Gebietsbetreuer und Zusteller als 'Filiale - Name'.
+
+    Returns:
+    tuple: (cube_slice, group_by_field)
+    """
+    if view_type == "Filiale":
+        return cube_slice, 'FILIALE'
+    name_field = 'ERFASSER' if view_type == "Gebietsbetreuer" else 'NAME/VT/ABNEHMER'
+    cube_slice = cube_slice.assign(combined_label=cube_slice['FILIALE'].astype(object) + ' - ' + cube_slice[name_field].astype(object))
+    return cube_slice, 'combined_label'
+
+
+def format_anzahl(value):
+    # Tausendertrennzeichen mit Punkt
+    return '{:,.0f}'.format(value).replace(',', '.')
+
+
+# Ab dieser Anzahl Einträge wird die Hauptgrafik seitenweise bzw. als Top/Bottom N angezeigt
+ENTITY_PAGE_SIZE = 50
+
+
+def select_entities(perf_rate, modus, anzahl, seite=1):
+    """
+    Wählt die anzuzeigenden Einträge nach ihrer PERF. NICHT_OK-Quote aus.
+
+    Parameters:
+    perf_rate (pandas.Series): Quote je Eintrag.
+    modus (str): 'Seitenweise', 'Top N' oder 'Bottom N'.
+    anzahl (int): Einträge pro Seite bzw. N.
+    seite (int): Seite (ab 1) für 'Seitenweise'.
+
+    Returns:
+    pandas.Index: Ausgewählte Einträge.
+    """
+    ranked = perf_rate.sort_values(ascending=False, kind='stable').index
+    if modus == 'Top N':
+        return ranked[:anzahl]
+    if modus == 'Bottom N':
+        return ranked[max(len(ranked) - anzahl, 0):]
+    start = (seite - 1) * anzahl
+    return ranked[start:start + anzahl]
+
+
+def build_stacked_bar_chart(group_stats, total_controls, view_mode, color_discrete_map):
+    """
+    Gestapeltes Balkendiagramm je Eintrag. Werte und Gesamtzahlen werden als Text
+    der Traces ausgegeben statt als einzelne Annotationen - die Größe der Grafik
+    wächst damit nur mit den Daten, nicht mit der Zahl der Beschriftungen.
+    """
+    y = list(group_stats.index)
+    fig = go.Figure()
+
+    for col in group_stats.columns:
+        values = group_stats[col]
+        if view_mode == "Prozentual":
+            text = [f"{v:.1f}%" if v > 0 else '' for v in values]
+        else:
+            text = [format_anzahl(v) if v > 0 else '' for v in values]
+
+        fig.add_trace(go.Bar(
+            x=values,
+            y=y,
+            name=col,
+            orientation='h',
+            marker_color=color_discrete_map.get(col),
+            text=text,
+            texttemplate='%{text}',
+            textposition='inside',
+            insidetextanchor='middle',
+            textfont=dict(color='black', size=13),
+        ))
+
+    # Gesamtzahl der Kontrollen links vom Balken (eine Text-Trace für alle Zeilen)
+    fig.add_trace(go.Scatter(
+        x=[0] * len(y),
+        y=y,
+        mode='text',
+        text=[f"Kontr.: {format_anzahl(int(total))}  " for total in total_controls.loc[group_stats.index]],
+        textposition='middle left',
+        textfont=dict(color='black', size=13),
+        showlegend=False,
+        hoverinfo='skip',
+        cliponaxis=False,
+    ))
+    return fig
     
 
 
     
 
 
+@st.cache_resource
+def figure_cache():
+    # Ein Diagramm-Cache für alle Sitzungen
+    return FigurCache()
+
+
+FIGURE_CACHE = figure_cache()
+
+
+@st.cache_resource
+def export_jobs():
+    # Hintergrund-Exporte für alle Sitzungen
+    return ExportJobs()
+
+
+EXPORT_JOBS = export_jobs()
+
+
+# Abstand, in dem ein laufender Export seinen Fortschritt aktualisiert (nur das Fragment)
+EXPORT_POLL_SECONDS = 0.5
+
+
+def lazy_download_button(label, job_key, build, file_name, mime, key):
+    """
+    Download-Button, dessen Datei erst nach Anforderung im Hintergrund erstellt wird.
+    Während der Erstellung wird nur der Fortschritt neu gezeichnet, der Rest der Seite bleibt bedienbar.
+
+    Parameters:
+    label (str): Beschriftung des Buttons.
+    job_key (str): Schlüssel des Exports (Daten-Fingerabdruck + Filter).
+    build (callable): build(progress) liefert die Datei als bytes.
+    """
+    job = EXPORT_JOBS.get(job_key)
+    if job is None:
+        if not st.button(f"{label} vorbereiten", key=f"{key}_prepare"):
+            return
+        job = EXPORT_JOBS.submit(job_key, build)
+
+    if job.done():
+        export_result(label, job_key, job, file_name, mime, key)
+    else:
+        export_progress(label, job_key)
+
+
+@st.fragment(run_every=EXPORT_POLL_SECONDS)
+def export_progress(label, job_key):
+    """
+    Fortschrittsbalken eines laufenden Exports; ist er fertig, wird die Seite einmal neu
+    ausgeführt und zeigt dann den Download-Button (das Fragment läuft danach nicht mehr).
+    """
+    job = EXPORT_JOBS.get(job_key)
+    if job is None or job.done():
+        st.rerun()
+    st.progress(job.progress, text=f"{label} wird erstellt …")
+
+
+def export_result(label, job_key, job, file_name, mime, key):
+    if job.exception() is not None:
+        EXPORT_JOBS.discard(job_key)
+        st.error(f"{label} konnte nicht erstellt werden: {job.exception()}")
+        return
+
+    st.download_button(label=label, data=job.result(), file_name=file_name, mime=mime, key=key)
+
+
+def build_summary_figure(cube_slice, group_by_field, view_mode, filiale_filter, start_date, end_date, color_discrete_map):
+    """
+    Zusammenfassung (ein gestapelter Balken) der ausgewählten Kontrollen.
+    """
+    # Erstelle Zusammenfassungs-Plot
+    summary_data = cube_slice.groupby('KONTROLLE', observed=True)['ANZAHL'].sum().reset_index(name='count')
+    total_sum = summary_data['count'].sum()
+    
+    if view_mode == "Prozentual":
+        summary_data['count'] = (summary_data['count'] / total_sum * 100)
+
+    kontrolle_order = ['PERF. NICHT_OK', 'NICHT_OK', 'OK']
+    summary_data['order'] = summary_data['KONTROLLE'].apply(lambda x: kontrolle_order.index(x) if x in kontrolle_order else len(kontrolle_order))
+    
+    if len(filiale_filter) == 0:
+        y_label = "Gesamt"
+    else:
+        y_label = "    ".join(filiale_filter)
+
+    summary_fig = px.bar(
+        summary_data,
+        y=[y_label] * len(summary_data),
+        x='count',
+        color='KONTROLLE',
+        orientation='h',
+        title=f'Zusammenfassung {y_label} von {start_date} - {end_date}',
+        color_discrete_map=color_discrete_map,
+        category_orders={'KONTROLLE': kontrolle_order},
+        labels={
+            'count': 'Prozent (%)' if view_mode == "Prozentual" else 'Anzahl',
+            'KONTROLLE': 'Kontrollergebnis'
+        }
+    )
+
+    # Layout für Zusammenfassungs-Plot mit fixer Breite und Höhe
+    summary_fig.update_layout(
+        barmode='stack',
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        font_color='darkorange',
+        showlegend=False,
+        xaxis_title='Prozent (%)' if view_mode == "Prozentual" else 'Anzahl',
+        yaxis_title='',
+        bargap=0.05,
+        bargroupgap=0.02,
+        height=200,  # Fixe Höhe
+        width=1700,  # Fixe Breite
+        margin=dict(l=60, r=150, t=40, b=40)  # Angepasste Margins
+    )
+
+    # Verbesserte Annotationen für Zusammenfassungs-Plot
+    total_controls_summary = cube_slice.loc[cube_slice[group_by_field].notna(), 'ANZAHL'].sum()
+
+        # Gesamtzahl der Kontrollen links vom Balken
+    summary_fig.add_annotation(
+        y=y_label,
+        x=-3,
+        text=f"Kontr.: {'{:,.0f}'.format(int(total_controls_summary)).replace(',', '.')}",
+        showarrow=False,
+        font=dict(color='black', size=13),
+        xanchor='right',
+        xshift=-5
+    )
+
+    # Sortiere die Daten entsprechend der vordefinierten Reihenfolge
+    kontrolle_order = ['PERF. NICHT_OK', 'NICHT_OK', 'OK']
+    sorted_summary_data = summary_data.sort_values(
+        by='KONTROLLE',
+        key=lambda x: pd.Categorical(x, categories=kontrolle_order, ordered=True)
+    )
+
+    # Berechne die kumulativen Positionen in der korrekten Reihenfolge
+    cumulative_positions = {}
+    current_position = 0
+    
+    for _, row in sorted_summary_data.iterrows():
+        value = row['count']
+        kontrolle = row['KONTROLLE']
+        
+        # Speichere die Mitte des aktuellen Balkens
+        cumulative_positions[kontrolle] = current_position + (value / 2)
+        current_position += value
+
+    # Füge Annotationen in der sortierten Reihenfolge hinzu
+    for kontrolle in kontrolle_order:
+        if kontrolle in cumulative_positions:
+            value = sorted_summary_data[sorted_summary_data['KONTROLLE'] == kontrolle]['count'].iloc[0]
+            x_pos = cumulative_positions[kontrolle]
+            
+            if value > 0:
+                if view_mode == "Prozentual":
+                    formatted_value = f"{value:.1f}%"
+                else:
+                    formatted_value = f"{'{:,.0f}'.format(value).replace(',', '.')}"
+                
+                summary_fig.add_annotation(
+                    y=y_label,
+                    x=x_pos,
+                    text=formatted_value,
+                    showarrow=False,
+                    font=dict(color='black', size=13),
+                    xanchor='center',
+                    yanchor='middle'
+                )
+    return summary_fig
+
+
+def build_main_figure(group_stats, total_controls, view_mode, view_type, start_date, end_date, color_discrete_map):
+    """
+    Hauptdiagramm der Performance-Ansicht (gestapelte Balken je Eintrag mit Layout).
+    """
+    fig = build_stacked_bar_chart(group_stats, total_controls, view_mode, color_discrete_map)
+
+    # Layout aktualisieren mit fixer Breite
+    fig.update_layout(
+        title=f'Verteilung der Kontrollergebnisse pro {view_type} von {start_date} - {end_date}',
+        height=max(600, len(group_stats) * 30),
+        barmode='stack',
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        font_color='darkorange',
+        showlegend=True,
+        legend_title_text='Kontrollergebnis',
+        xaxis_title='Prozent (%)' if view_mode == "Prozentual" else 'Anzahl',
+        yaxis_title=view_type,
+        yaxis=dict(automargin=True),
+        bargap=0.2,
+        bargroupgap=0.1,
+        width=1500,  # Fixe Breite für das Hauptdiagramm
+        margin=dict(l=0, r=0, t=22, b=0),
+    )
+    return fig
+
+
+@st.cache_resource(max_entries=16)
+def raw_table_order(_df, fingerprint, table_key, filter_column, filter_text, sort_by, ascending):
+    """
+    Zeilenreihenfolge einer Rohdaten-Tabelle; Blättern und Spaltenwahl rechnen nicht neu.
+    """
+    return tabellenansicht.row_order(_df, filter_column, filter_text, sort_by, ascending)
+
+
+@st.cache_resource(max_entries=16)
+def raw_table_summary(_df, fingerprint, table_key):
+    return tabellenansicht.filial_summary(_df)
+
+
+def raw_table_view(title, frames, fingerprint, key):
+    """
+    Rohdaten einer Monatsart: Übersicht je Filiale und seitenweise Tabelle.
+    Filter, Sortierung und Seiten werden auf dem Server berechnet, an den Browser geht nur die sichtbare Seite.
+    """
+    st.subheader(f"{title}:")
+    datei = 0
+    if len(frames) > 1:
+        datei = st.selectbox("Datei:", range(len(frames)), format_func=lambda i: f"{title} {i+1}", key=f"{key}_datei")
+    df = frames[datei]
+    table_key = (key, datei)
+
+    summary = raw_table_summary(df, fingerprint, table_key)
+    if summary is not None:
+        st.dataframe(summary, use_container_width=True, hide_index=True)
+
+    with st.expander(f"Rohdaten {title} ({len(df):,} Zeilen)".replace(',', '.')):
+        all_columns = list(df.columns)
+        columns = st.multiselect("Spalten:", all_columns, default=all_columns, key=f"{key}_spalten")
+
+        col_a, col_b, col_c = st.columns(3)
+        with col_a:
+            filter_column = st.selectbox("Filter auf Spalte:", [None] + all_columns,
+                                         format_func=lambda col: '(kein Filter)' if col is None else col,
+                                         key=f"{key}_filterspalte")
+            filter_text = st.text_input("enthält:", key=f"{key}_filtertext", disabled=filter_column is None)
+        with col_b:
+            sort_by = st.selectbox("Sortieren nach:", [None] + all_columns,
+                                   format_func=lambda col: '(Dateireihenfolge)' if col is None else col,
+                                   key=f"{key}_sortierung")
+            ascending = st.radio("Reihenfolge:", ['Aufsteigend', 'Absteigend'], horizontal=True,
+                                 key=f"{key}_richtung", disabled=sort_by is None) == 'Aufsteigend'
+
+        positions = raw_table_order(df, fingerprint, table_key, filter_column, filter_text.strip(), sort_by, ascending)
+
+        with col_c:
+            page_size = st.selectbox("Zeilen pro Seite:", tabellenansicht.PAGE_SIZES,
+                                     index=tabellenansicht.PAGE_SIZES.index(tabellenansicht.PAGE_SIZE),
+                                     key=f"{key}_seitengroesse")
+            page_count = tabellenansicht.page_count(len(positions), page_size)
+            # Neue Seitenzahl (anderer Filter/Seitengröße) beginnt wieder bei Seite 1
+            page = st.number_input("Seite:", min_value=1, max_value=page_count, value=1,
+                                   key=f"{key}_seite_{page_count}")
+
+        st.dataframe(tabellenansicht.table_page(df, positions, page, page_size, columns), use_container_width=True)
+        st.caption(f"Seite {page} von {page_count} - {len(positions):,} von {len(df):,} Zeilen".replace(',', '.'))
+
+
+# Einträge, die im Trend ohne eigene Auswahl gezeigt werden (höchste PERF. NICHT_OK-Quote)
+TREND_ENTITIES = 10
+
+
+def build_trend_figure(trend, view_type, aufloesung, fenster):
+    """
+    Liniendiagramm der Quoten je Eintrag über die Zeit (eine Linienart je Kontrollergebnis).
+    """
+    fig = px.line(
+        trend,
+        x='TAG',
+        y='QUOTE',
+        color='EINTRAG',
+        line_dash='KONTROLLE' if trend['KONTROLLE'].nunique() > 1 else None,
+        hover_data={'KONTROLLEN': ':,.0f', 'QUOTE': ':.1f'},
+        markers=aufloesung != 'Täglich',
+    )
+    fenster_text = f", gleitend über {fenster} Perioden" if fenster > 1 else ""
+    fig.update_layout(
+        title=f'Quote der Kontrollergebnisse pro {view_type} ({aufloesung.lower()}{fenster_text})',
+        height=600,
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        font_color='darkorange',
+        legend_title_text=view_type,
+        xaxis_title='Zeitraum',
+        yaxis_title='Prozent (%)',
+        yaxis=dict(rangemode='tozero'),
+        margin=dict(l=0, r=0, t=40, b=0),
+    )
+    return fig
+
+
 # Funktion zum Erstellen des Balkendiagramms
 def create_bar_chart(df, x, y, title):
     fig = px.bar(df, x=x, y=y, title=title)
@@ -369,6 +897,10 @@ def create_bar_chart(df, x, y, title):
 # Streamlit-App-Konfiguration
 st.set_page_config(layout="wide", page_title="Datenanalyse Tool")
 
+# Fehlerhafte Änderung an der Konfiguration: letzte gültige Version bleibt aktiv
+if KONFIG_FEHLER:
+    st.warning(f"Konfiguration nicht übernommen ({konfiguration.CONFIG_PATH.name}): {KONFIG_FEHLER}")
+
 # CSS für das Farbschema
 st.markdown(f"""
     <style>
@@ -438,12 +970,75 @@ st.title("Datenanalyse Tool")
 
 # Datei-Upload
 # Beispielaufruf der Funktion
-files = st.file_uploader("Lade deine Excel-Dateien hoch", accept_multiple_files=True)
+files = st.file_uploader("Lade deine Dateien hoch (XLSX, CSV, Parquet, Feather)", accept_multiple_files=True)
 special_column = 'IST'
 monthly_column = 'AUSZAHLBEMERKUNG','STUECK','ZUSATZAUFWAND', 'Kostenstelle', 'dbStueck'
-if files:
-    regular_df, special_dataframes, monthly_dfs = load_data(files, special_column, monthly_column)
-    
+data_source = st.sidebar.selectbox("Datenquelle:", ["Upload", "Lokaler Speicher"],
+                                   help="Lokaler Speicher: alle bisher gespeicherten Uploads, ohne erneutes Einlesen")
+data_loaded = False
+
+with st.sidebar.expander("Duplikate"):
+    dedup_enabled = st.checkbox("Doppelte Kontrollen entfernen", value=True)
+    dedup_key = st.multiselect("Schlüssel:", options=list(REGULAR_COLUMNS), default=list(DEDUP_KEY))
+dedup_key = tuple(dedup_key) if dedup_enabled else ()
+
+if data_source == "Lokaler Speicher":
+    first_date, last_date = datenspeicher.date_range()
+    last_date = (last_date or pd.Timestamp.now()).date()
+    first_date = (first_date or pd.Timestamp(last_date)).date()
+    store_range = st.sidebar.date_input(
+        "Zeitraum:",
+        value=(max(first_date, last_date - timedelta(days=30)), last_date),
+        help="Kontrollen nach ERFASST, Benchmark- und Monatsdateien nach dem Zeitraum ihrer Daten (ERFASST bzw. JAHR/MONAT, sonst Importdatum)",
+    )
+    if len(store_range) == 2:
+        store_start, store_end = store_range
+        store_version = datenspeicher.version()
+        regular_df, special_dataframes, monthly_dfs, import_report, memory_report = load_store_data(
+            store_start, store_end, monthly_column, store_version, dedup_key, KONFIG.versions['zusatzinfos']
+        )
+        fingerprint = f"store:{store_version}:{store_start}:{store_end}:{dedup_key}"
+        data_loaded = True
+
+        with st.sidebar.expander("Gespeicherte Dateien"):
+            st.dataframe(import_report, use_container_width=True)
+
+elif files:
+    parallel_import = st.sidebar.checkbox("Dateien parallel einlesen", value=True)
+    store_uploads = st.sidebar.checkbox("Uploads im lokalen Speicher ablegen", value=True)
+
+    with st.sidebar.expander("Datei-Cache"):
+        use_cache = st.checkbox("Cache verwenden", value=True)
+        cache_limit_mb = st.number_input("Maximale Größe (MB)", min_value=16, value=dateicache.CACHE_LIMIT_MB, step=64)
+        cache_entries, cache_size_mb = dateicache.stats()
+        st.caption(f"{cache_entries} Dateien, {cache_size_mb:.1f} MB")
+        if st.button("Cache leeren"):
+            dateicache.purge()
+            st.success("Cache geleert")
+
+    regular_df, special_dataframes, monthly_dfs, import_report, memory_report = load_data(
+        files, special_column, monthly_column, parallel_import, use_cache, cache_limit_mb, store_uploads, dedup_key,
+        KONFIG.versions['zusatzinfos'],
+    )
+    fingerprint = f"{upload_fingerprint(files)}:{dedup_key}"
+    data_loaded = True
+
+    # Fehlerhafte Dateien melden
+    for fehler in import_report.loc[import_report['Fehler'] != '', 'Fehler']:
+        st.error(fehler)
+
+    with st.sidebar.expander("Import-Protokoll"):
+        st.dataframe(import_report, use_container_width=True)
+        st.caption(f"Gesamt: {import_report['Sekunden'].sum():.2f} s Rechenzeit für {len(import_report)} Dateien, "
+                   f"{import_report['Duplikate'].sum()} doppelte Kontrollen entfernt")
+
+# Platz für den Diagramm-Cache; befüllt am Ende, damit die Zähler diesen Lauf enthalten
+figure_cache_box = st.sidebar.empty()
+
+if data_loaded:
+    if memory_report is not None:
+        with st.sidebar.expander("Speicherbedarf Kontrolldaten"):
+            st.dataframe(memory_report, use_container_width=True)
     
     # Sidebar
     st.sidebar.title("Auswertungen")
@@ -454,92 +1049,71 @@ if files:
 
         if regular_df is not None:
                 
-            regular_df['ERFASST'] = pd.to_datetime(regular_df['ERFASST'], format='%d.%m.%Y %H:%M:%S', errors='coerce')
-            min_date = regular_df['ERFASST'].min()
-            max_date = regular_df['ERFASST'].max()
-
-                
-                
-            # Liste der zu löschenden Zusatzinfos
-            def remove_info(row, info_to_remove):
-                infos = row.split()
-                infos = [info for info in infos if info not in info_to_remove]
-                return ' '.join(infos)
-
-            # Infos, die entfernt werden sollen
-            info_to_remove = ['NICHT_ZUGESTELLT',
-                                    'AUFTRAG',
-                                    'ZUSTELLUNG_NICHT_MOEGLICH',
-                                    'FALSCHE_VERTEILART',
-                                    'ABZUG'
-                                    ]
-                
-                # Anwenden der Funktion auf die Spalte 'zusatzinfo'
-            regular_df['ZUSATZINFO'] = regular_df['ZUSATZINFO'].apply(lambda x: remove_info(x, info_to_remove))
-                
-                # Aktualisiere die Filialzuordnung basierend auf PLZ-Bereichen
-            df = apply_fixed_filiale(regular_df)
+            # Aufbereitung ist pro Upload und Zuordnungs-Version gecacht.
+            # performance.df ist geteilt - im Folgenden nur gefilterte Ausschnitte verändern
+            performance = prepare_performance_data(regular_df, fingerprint, MAPPING_VERSION)
+            df = performance.df
+            min_date = performance.min_date
+            max_date = performance.max_date
 
                 # Layout für die Filter nebeneinander
             col1, col2, col3, col4, col5, col6 = st.columns(6)
 
             with col1:
-                filiale_filter = sorted(df[df['FILIALE'].isin(['Fil01', 'Fil02', 'Fil03', 'Fil05', 
-                                                             'Fil06', 'Fil07', 'Fil08', 'Fil09', 
-                                                             'Fil10', 'Fil13', 'Fil15'])]['FILIALE'].unique())
-                filiale_filter = st.multiselect("Filiale:", options=filiale_filter)
+                filiale_filter = st.multiselect("Filiale:", options=performance.filialen)
             with col2:
                     view_type = st.selectbox("Ansicht:", ["Filiale", "Gebietsbetreuer", "Zusteller"])
             with col3:
                     status_filter = st.selectbox("Status:", ["Alle", "Performance"])
             with col4:
-                type_filter = st.multiselect('Type:', sorted(df['TYPE'].unique()))
+                type_filter = st.multiselect('Type:', performance.types)
             with col5:
                 view_mode = st.selectbox("Werte:", ["Prozentual", "Numerisch"])
             with col6:
                 start_date = st.date_input('Startdatum', value=max_date, min_value=min_date, max_value=max_date)
                 end_date = st.date_input('Enddatum', value=max_date, min_value=min_date, max_value=max_date)
 
+            if status_filter == "Performance":
+                # Nur PERF. NICHT_OK für Performance
+                kontrollen = ['PERF. NICHT_OK', 'OK']
+            else:
+                # PERF. NICHT_OK und NICHT_OK für Alle
+                kontrollen = ['PERF. NICHT_OK', 'NICHT_OK', 'OK']
+
+            # Kontroll-Würfel einmal pro Upload aufbauen und nur noch zuschneiden
+            cube = build_kontroll_cube(df, fingerprint, MAPPING_VERSION)
+            cube_slice = slice_cube(cube, start_date, end_date, filiale_filter, type_filter, kontrollen)
+
+            # Rohdaten werden nur noch für die Zusatzinfo-Tabelle gefiltert.
+            # Filter auf das Datum zuerst - Ausschnitt der nach ERFASST sortierten Daten
+            df = date_slice(performance, start_date, end_date)
+
             if filiale_filter:
                 df = df[df['FILIALE'].isin(filiale_filter)]
 
-            # Filter auf das Datum anwenden
-            df['ERFASST'] = df['ERFASST'].dt.date
-            df = df[(df['ERFASST'] >= start_date) & (df['ERFASST'] <= end_date)]
-
             if type_filter:
                 df = df[df['TYPE'].isin(type_filter)]
 
-            # Vorbereitung der Daten basierend auf der Ansicht
-            if view_type == "Filiale":
-                group_by_field = 'FILIALE'
-            elif view_type == "Gebietsbetreuer":
-                df['combined_label'] = df['FILIALE'] + ' - ' + df['ERFASSER']
-                group_by_field = 'combined_label'
-            else:  # VT
-                df['combined_label'] = df['FILIALE'] + ' - ' + df['NAME/VT/ABNEHMER']
-                group_by_field = 'combined_label'
+            df = df[df['KONTROLLE'].isin(kontrollen)]
 
-            if status_filter == "Performance":
-                # Nur PERF. NICHT_OK für Performance
-                df = df[df['KONTROLLE'].isin(['PERF. NICHT_OK', 'OK'])]
-                    
-            else:
-                # PERF. NICHT_OK und NICHT_OK für Alle
-                df = df[df['KONTROLLE'].isin(['PERF. NICHT_OK', 'NICHT_OK', 'OK'])]
+            # Vorbereitung der Daten basierend auf der Ansicht
+            cube_slice, group_by_field = label_cube(cube_slice, view_type)
 
             # Gruppierung ohne Zusatzinfo
-            group_stats = df.groupby([group_by_field, 'KONTROLLE']).size().unstack(fill_value=0)
+            group_stats = cube_group_stats(cube_slice, group_by_field)
 
             # Berechne Gesamtzahl der Kontrollen
-            total_controls = df.groupby(group_by_field)[group_by_field].count()
+            total_controls = group_stats.sum(axis=1)
+
+            # PERF. NICHT_OK-Quote für die Auswahl von Top/Bottom N
+            if 'PERF. NICHT_OK' in group_stats.columns:
+                perf_rate = group_stats['PERF. NICHT_OK'] / total_controls
+            else:
+                perf_rate = pd.Series(0.0, index=group_stats.index)
 
             # Prozentualer Modus für Kontrollen
             if view_mode == "Prozentual":
-                for idx in group_stats.index:
-                    total = total_controls[idx]
-                    if total > 0:  # Verhindere Division durch Null
-                        group_stats.loc[idx] = (group_stats.loc[idx] / total) * 100
+                group_stats = group_stats.div(total_controls, axis=0) * 100
 
             # Sortierung basierend auf Status Filter
             if status_filter == "Performance" and 'PERF. NICHT_OK' in group_stats.columns:
@@ -550,6 +1124,27 @@ if files:
                 sort_cols = ['PERF. NICHT_OK', 'NICHT_OK']
                 group_stats = group_stats.sort_values(by=sort_cols, ascending=[True] * len(sort_cols))
 
+            # Bei vielen Einträgen nur eine Seite bzw. Top/Bottom N darstellen
+            entity_count = len(group_stats)
+            entity_selection = None
+            if entity_count > ENTITY_PAGE_SIZE:
+                col_a, col_b, col_c = st.columns(3)
+                with col_a:
+                    entity_mode = st.selectbox("Anzeige:", ['Seitenweise', 'Top N', 'Bottom N'],
+                                               help='Top/Bottom nach PERF. NICHT_OK-Quote')
+                with col_b:
+                    entity_limit = st.number_input("Anzahl:", min_value=10, max_value=200,
+                                                   value=ENTITY_PAGE_SIZE, step=10)
+                with col_c:
+                    page_count = -(-entity_count // entity_limit)
+                    entity_page = st.number_input("Seite:", min_value=1, max_value=page_count, value=1,
+                                                  disabled=entity_mode != 'Seitenweise')
+
+                selected_entities = select_entities(perf_rate, entity_mode, entity_limit, entity_page)
+                entity_selection = (entity_mode, entity_limit, entity_page)
+                group_stats = group_stats[group_stats.index.isin(selected_entities)]
+                st.caption(f"{len(group_stats)} von {entity_count} Einträgen ({view_type})")
+
             # Spaltenreihenfolge festlegen
             if 'PERF. NICHT_OK' in group_stats.columns:
                 sorted_columns = ['PERF. NICHT_OK'] + [col for col in group_stats.columns if col != 'PERF. NICHT_OK']
@@ -565,190 +1160,33 @@ if files:
                 'OK': '#F3E2A9',
             }
 
-            # Erstelle Zusammenfassungs-Plot
-            summary_data = df.groupby('KONTROLLE')['KONTROLLE'].count().reset_index(name='count')
-            total_sum = summary_data['count'].sum()
-            
-            if view_mode == "Prozentual":
-                summary_data['count'] = (summary_data['count'] / total_sum * 100)
-
-            kontrolle_order = ['PERF. NICHT_OK', 'NICHT_OK', 'OK']
-            summary_data['order'] = summary_data['KONTROLLE'].apply(lambda x: kontrolle_order.index(x) if x in kontrolle_order else len(kontrolle_order))
-            
-            if len(filiale_filter) == 0:
-                y_label = "Gesamt"
-            else:
-                y_label = "    ".join(filiale_filter)
-
-            summary_fig = px.bar(
-                summary_data,
-                y=[y_label] * len(summary_data),
-                x='count',
-                color='KONTROLLE',
-                orientation='h',
-                title=f'Zusammenfassung {y_label} von {start_date} - {end_date}',
-                color_discrete_map=color_discrete_map,
-                category_orders={'KONTROLLE': kontrolle_order},
-                labels={
-                    'count': 'Prozent (%)' if view_mode == "Prozentual" else 'Anzahl',
-                    'KONTROLLE': 'Kontrollergebnis'
-                }
-            )
-
-            # Layout für Zusammenfassungs-Plot mit fixer Breite und Höhe
-            summary_fig.update_layout(
-                barmode='stack',
-                plot_bgcolor='white',
-                paper_bgcolor='white',
-                font_color='darkorange',
-                showlegend=False,
-                xaxis_title='Prozent (%)' if view_mode == "Prozentual" else 'Anzahl',
-                yaxis_title='',
-                bargap=0.05,
-                bargroupgap=0.02,
-                height=200,  # Fixe Höhe
-                width=1700,  # Fixe Breite
-                margin=dict(l=60, r=150, t=40, b=40)  # Angepasste Margins
-            )
-
-            # Verbesserte Annotationen für Zusammenfassungs-Plot
-            total_controls_summary = df[group_by_field].count()
-
-                # Gesamtzahl der Kontrollen links vom Balken
-            summary_fig.add_annotation(
-                y=y_label,
-                x=-3,
-                text=f"Kontr.: {'{:,.0f}'.format(int(total_controls_summary)).replace(',', '.')}",
-                showarrow=False,
-                font=dict(color='black', size=13),
-                xanchor='right',
-                xshift=-5
+            # Diagramme aus dem Diagramm-Cache (Schlüssel: Daten + Filterzustand)
+            figure_state = (
+                fingerprint, MAPPING_VERSION, start_date, end_date, tuple(filiale_filter), set(type_filter),
+                status_filter, view_type, view_mode,
             )
 
-            # Sortiere die Daten entsprechend der vordefinierten Reihenfolge
-            kontrolle_order = ['PERF. NICHT_OK', 'NICHT_OK', 'OK']
-            sorted_summary_data = summary_data.sort_values(
-                by='KONTROLLE',
-                key=lambda x: pd.Categorical(x, categories=kontrolle_order, ordered=True)
+            # Erstelle Zusammenfassungs-Plot
+            summary_fig = FIGURE_CACHE.get_or_build(
+                figure_key('summary', *figure_state),
+                lambda: build_summary_figure(
+                    cube_slice, group_by_field, view_mode, filiale_filter, start_date, end_date, color_discrete_map
+                ),
             )
 
-            # Berechne die kumulativen Positionen in der korrekten Reihenfolge
-            cumulative_positions = {}
-            current_position = 0
-            
-            for _, row in sorted_summary_data.iterrows():
-                value = row['count']
-                kontrolle = row['KONTROLLE']
-                
-                # Speichere die Mitte des aktuellen Balkens
-                cumulative_positions[kontrolle] = current_position + (value / 2)
-                current_position += value
-
-            # Füge Annotationen in der sortierten Reihenfolge hinzu
-            for kontrolle in kontrolle_order:
-                if kontrolle in cumulative_positions:
-                    value = sorted_summary_data[sorted_summary_data['KONTROLLE'] == kontrolle]['count'].iloc[0]
-                    x_pos = cumulative_positions[kontrolle]
-                    
-                    if value > 0:
-                        if view_mode == "Prozentual":
-                            formatted_value = f"{value:.1f}%"
-                        else:
-                            formatted_value = f"{'{:,.0f}'.format(value).replace(',', '.')}"
-                        
-                        summary_fig.add_annotation(
-                            y=y_label,
-                            x=x_pos,
-                            text=formatted_value,
-                            showarrow=False,
-                            font=dict(color='black', size=13),
-                            xanchor='center',
-                            yanchor='middle'
-                        )
             # Zeige Zusammenfassungs-Plot
             st.plotly_chart(summary_fig, use_container_width=False)
 
             st.markdown("---")
 
-            # Daten für den Plot vorbereiten
-            melted_data = pd.melt(
-                plot_data,
-                id_vars=[group_by_field],
-                value_vars=[col for col in plot_data.columns if col != group_by_field],
-                var_name='category',  
-                value_name='value'    
-            )
-
-            # Füge die Farbkategorie hinzu
-            melted_data['color_category'] = melted_data['category']
-            
             # Erstelle den Hauptplot
-            fig = px.bar(
-                melted_data,
-                y=group_by_field,
-                x='value',
-                color='color_category',
-                title=f'Verteilung der Kontrollergebnisse pro {view_type} von {start_date} - {end_date}',
-                labels={
-                    'value': 'Prozent (%)' if view_mode == "Prozentual" else 'Anzahl',
-                    'color_category': 'Kontrollergebnis',
-                    group_by_field: view_type
-                },
-                height=max(600, len(group_stats) * 30),
-                orientation='h',
-                color_discrete_map=color_discrete_map,
-                barmode='relative'
-            )
-
-            # Layout aktualisieren mit fixer Breite
-            fig.update_layout(
-                barmode='stack',
-                plot_bgcolor='white',
-                paper_bgcolor='white',
-                font_color='darkorange',
-                showlegend=True,
-                legend_title_text='Kontrollergebnis',
-                xaxis_title='Prozent (%)' if view_mode == "Prozentual" else 'Anzahl',
-                yaxis_title=view_type,
-                bargap=0.2,
-                bargroupgap=0.1,
-                width=1500,  # Fixe Breite für das Hauptdiagramm
-                margin=dict(l=0, r=0, t=22, b=0),
+            fig = FIGURE_CACHE.get_or_build(
+                figure_key('performance', *figure_state, entity_selection),
+                lambda: build_main_figure(
+                    group_stats, total_controls, view_mode, view_type, start_date, end_date, color_discrete_map
+                ),
             )
 
-            # Annotationen für Hauptplot
-            for idx in group_stats.index:
-                # Gesamtzahl der Kontrollen links vom Balken
-                fig.add_annotation(
-                    y=idx,
-                    x=-2,
-                    text=f"Kontr.: {'{:,.0f}'.format(int(total_controls[idx])).replace(',', '.')}",
-                    showarrow=False,
-                    font=dict(color='black', size=13),
-                    xanchor='right',
-                    xshift=-5 
-                )
-
-                # Werte auf den Balken
-                cumulative_x = 0
-                for col in group_stats.columns:
-                    value = group_stats.loc[idx, col]
-                    if value > 0:
-                        if view_mode == "Prozentual":
-                            formatted_value = f"{value:.1f}%"
-                        else:
-                            formatted_value = f"{'{:,.0f}'.format(value).replace(',', '.')}"
-                        
-                        fig.add_annotation(
-                            y=idx,
-                            x=cumulative_x + (value/2),
-                            text=formatted_value,
-                            showarrow=False,
-                            font=dict(color='black', size=13),
-                            xanchor='center'
-                        )
-                    cumulative_x += value
-
 
             # For the DataFrame display
             def format_numbers(x):
@@ -757,14 +1195,8 @@ if files:
                         return '{:,.0f}'.format(x).replace(',', '.')
                 return x
 
-            # Explodiere die Zusatzinfo-Spalte
-            df = df.assign(ZUSATZINFO=df['ZUSATZINFO'].str.split()).explode('ZUSATZINFO')
-
-            # Gruppiere die Daten nach ZUSATZINFO und TYPE und berechne die Anzahl
-            grouped_df = df.groupby(['ZUSATZINFO', 'TYPE']).size().reset_index(name='COUNT')
-
-            # Erstelle eine Pivot-Tabelle
-            pivot_df = grouped_df.pivot(index='ZUSATZINFO', columns='TYPE', values='COUNT').fillna(0)
+            # Zusatzinfos je TYPE über die Bitmaske zählen
+            pivot_df = zusatzinfo.count_by(df, 'TYPE', ZUSATZINFO_REGISTRY)
 
             # Berechne die Gesamtanzahl basierend auf dem "Werte:"-Filter
             pivot_df['Gesamt'] = pivot_df.sum(axis=1)
@@ -807,24 +1239,17 @@ if files:
 
                     # Filtere das DataFrame basierend auf der Auswahl und dem view_type
                     if dataframe_filter:
-                        filtered_df = df.copy()  # Create a copy of the original dataframe
                         if view_type == "Gebietsbetreuer":
                             # Extrahiere den ERFASSER-Teil aus combined_label
                             erfasser = dataframe_filter.split(' - ')[1]
-                            filtered_df = filtered_df[filtered_df['ERFASSER'] == erfasser]
+                            filtered_df = df[df['ERFASSER'] == erfasser]
                         else:  # Zusteller
                             # Extrahiere den NAME/VT/ABNEHMER-Teil aus combined_label
                             vt_name = dataframe_filter.split(' - ')[1]
-                            filtered_df = filtered_df[filtered_df['NAME/VT/ABNEHMER'] == vt_name]
+                            filtered_df = df[df['NAME/VT/ABNEHMER'] == vt_name]
 
-                        # Explodiere die Zusatzinfo-Spalte für das gefilterte DataFrame
-                        filtered_df = filtered_df.assign(ZUSATZINFO=filtered_df['ZUSATZINFO'].str.split()).explode('ZUSATZINFO')
-                        
-                        # Gruppiere die gefilterten Daten
-                        grouped_filtered = filtered_df.groupby(['ZUSATZINFO', 'TYPE']).size().reset_index(name='COUNT')
-                        
-                        # Erstelle die Pivot-Tabelle für die gefilterten Daten
-                        filtered_pivot = grouped_filtered.pivot(index='ZUSATZINFO', columns='TYPE', values='COUNT').fillna(0)
+                        # Zusatzinfos der gefilterten Daten je TYPE zählen
+                        filtered_pivot = zusatzinfo.count_by(filtered_df, 'TYPE', ZUSATZINFO_REGISTRY)
                         filtered_pivot = filtered_pivot.reset_index()
                         
                         # Berechne die Gesamtanzahl
@@ -857,6 +1282,52 @@ if files:
                 st.dataframe(styled_pivot_df, 
                             height=500,
                             use_container_width=True)
+
+            # Trend über mehrere Monate: Quoten je Periode aus den Tageszählungen des Würfels
+            st.markdown("---")
+            if st.checkbox("Trend über mehrere Monate anzeigen"):
+                trend_col1, trend_col2, trend_col3, trend_col4 = st.columns(4)
+                with trend_col1:
+                    trend_start = st.date_input('Trend ab', value=max(min_date, max_date - timedelta(days=365)),
+                                                min_value=min_date, max_value=max_date)
+                    trend_end = st.date_input('Trend bis', value=max_date, min_value=min_date, max_value=max_date)
+                with trend_col2:
+                    aufloesung = st.selectbox("Auflösung:", list(trendanalyse.AUFLOESUNGEN), index=1)
+                    fenster = st.number_input("Gleitendes Fenster (Perioden):", min_value=1, max_value=90, value=1)
+                with trend_col3:
+                    trend_kontrollen = st.multiselect("Quote:", kontrollen, default=['PERF. NICHT_OK'])
+
+                trend_slice = slice_cube(cube, trend_start, trend_end, filiale_filter, type_filter, kontrollen)
+                trend_slice, trend_field = label_cube(trend_slice, view_type)
+
+                # Auswahl der Einträge, vorbelegt mit den höchsten PERF. NICHT_OK-Quoten
+                trend_stats = cube_group_stats(trend_slice, trend_field)
+                if 'PERF. NICHT_OK' in trend_stats.columns:
+                    trend_rate = trend_stats['PERF. NICHT_OK'] / trend_stats.sum(axis=1)
+                else:
+                    trend_rate = pd.Series(0.0, index=trend_stats.index)
+                ranked = select_entities(trend_rate, 'Seitenweise', len(trend_rate))
+                with trend_col4:
+                    trend_entities = st.multiselect(f"{view_type}:", list(ranked), default=list(ranked[:TREND_ENTITIES]))
+
+                if trend_slice.empty or not trend_entities or not trend_kontrollen:
+                    st.info("Keine Daten für den gewählten Trend.")
+                else:
+                    def build_trend():
+                        counts = trendanalyse.daily_counts(trend_slice, trend_field, trend_entities)
+                        trend = trendanalyse.trend_rates(counts, trendanalyse.AUFLOESUNGEN[aufloesung], int(fenster))
+                        trend = trend[trend['KONTROLLE'].isin(trend_kontrollen)]
+                        return build_trend_figure(trend, view_type, aufloesung, int(fenster))
+
+                    trend_fig = FIGURE_CACHE.get_or_build(
+                        figure_key(
+                            'trend', fingerprint, MAPPING_VERSION, trend_start, trend_end, tuple(filiale_filter),
+                            set(type_filter), status_filter, view_type, aufloesung, int(fenster),
+                            set(trend_kontrollen), set(trend_entities),
+                        ),
+                        build_trend,
+                    )
+                    st.plotly_chart(trend_fig, use_container_width=True)
     
     elif menu == "Benchmark":
         st.subheader("Benchmark")
@@ -865,85 +1336,14 @@ if files:
 
              
 
-            names_to_remove = ['BEHABETZ THOMAS', 'JARNIG JOACHIM', 'Dujkovic David', 'TRAUM SIMON', 'KROKER THOMAS']
-
-            fixed_branches  = {
-                    'Fil01' : ['AKRAP Ivica', 'FRATRIK Anton', 'JURACKA MIROSLAV', 'KUBES PAVEL', 'NAGY ZSOLT', 'ÖZTÜRK TOLGA', 'PALAGIC SORIN-MIRCEA', 'VIASZ-KADI IMRE'],
-
-                    'Fil02' : ['HINTERWALLNER PATRICK', 'IZER PETER', 'KLARIC SASA', 'Lastro Marko', 'MORAR Catalin', 'SALA STANISLAV'],
-                    
-                    'Fil03' : ['AMBRUS DOREL', 'BATISTA ', 'DANIHEL Norbert', 'GHOTRA GURVINDER SINGH', 'LAPOSA MIKLOS', 'MAYER ', 'RISTIC ', 'TOTH ', 'VIRAG ADAM'] ,
-
-                    'Fil05' : ['ADAMOVIC LUBOMIR', 'KAJDIC Muhamed', 'KRUK Maciej', 'LOBODAS MAREK', 'Lubinski Stanislaw', 'PETRANEK IVAN', 'RACZ LASZLO BALINT'] ,
-
-                    'Fil06' : ['MÜLLNER MARIO', 'PAYR FLORIAN', 'Vergeiner Fabian'],
-
-                    'Fil07' : ['HABERL GERALD', 'JOZSA ROLAND', 'SEBÖK ROBERT', 'STAUDINGER FRIEDRICH'] ,
-
-                    'Fil08' : ['Klavik Kurt', 'LIPKA ZOLTAN', 'NIEFERGALL GERALD', 'Saibl Klaus', 'SCHÖPF OTMAR', 'STEIDL ANDREAS', 'Weidinger Christian'] ,
-
-                    'Fil09' : ['DUSEK Petr', 'HUMER Sven Sebastian', 'IVANIC Roman', 'KOBIDA ROMAN', 'NAIRZ MICHAEL', 'PODMAJERSKY Viktor', 'REICH Roland', 
-                    'SIMKO RADEK', 'VYBOH Jaroslav', 'WEIDINGER THOMAS', 'WINKLER Christian', 'ZSAKOVICS Adrian'] ,
-                    
-                    'Fil10' : ['BOGAR ADAM', 'GALAVITS PATRIK', 'KÄFFER Dietmar', 'Neger Helmut', 'VIDA ÁDÁM'] ,
-
-                    'Fil13' : ['GAZICA Ivica', 'KARL ELISABETH', 'KLAMBAUER Erwin', 'KONDOR', 'REBEKIC Vlatko', 'SZUPPIN Bianca', 'VARGA ARPAD'] ,
-
-                    'Fil15' : ['PICHLER Maximilian', 'RISTIC Sretko', 'ZICKBAUER Gerald', 'BAYER SIEGFRIED']  
-                    }
-
-            target_values  = {
+            # Rollen der Erfasser (Gebietsbetreuer, Filialleiter, Regionalleiter) aus der Konfiguration
+            info_gb = KONFIG.info_gb
 
-                444 : ['BAYER SIEGFRIED', 'KLAMBAUER Erwin', 'SCHÖPF OTMAR'],
-
-                518 : ['KARL Elisabeth'],
-
-                777 : ['SZUPPIN Bianca'],
-
-                806 : ['PODMAJERSKY Viktor'],
-
-                884 : ['IVANIC Roman'],
-
-                995 : ['DUSEK Petr'],
-
-                997 : ['PAYR FLORIAN', 'Vergeiner Fabian'],
-
-                1036 : ['HINTERWALLNER PATRICK', 'KAJDIC Muhamed', 'Neger Helmut', 'ÖZTÜRK TOLGA', 
-                'RISTIC ', 'STAUDINGER FRIEDRICH', 'STEIDL ANDREAS', 'WINKLER Christian',],
-
-                1106 : ['ADAMOVIC LUBOMIR', 'AKRAP Ivica', 'AMBRUS DOREL', 'BATISTA ', 'BOGAR ADAM', 'FRATRIK Anton', 'GALAVITS PATRIK',
-                'GAZICA Ivica', 'GHOTRA GURVINDER SINGH', 'HUMER Sven Sebastian', 'IZER PETER', 'JOZSA ROLAND', 'JURACKA MIROSLAV', 'KÄFFER Dietmar',
-                'Klavik Kurt', 'KOBIDA ROMAN', 'KRUK Maciej', 'KUBES PAVEL', 'LAPOSA MIKLOS', 'Lastro Marko', 'LIPKA ZOLTAN', 
-                'LOBODAS MAREK', 'Lubinski Stanislaw', 'MAYER ', 'MORAR Catalin', 'MÜLLNER MARIO', 'NAGY ZSOLT', 'NAIRZ MICHAEL',
-                'NIEFERGALL GERALD', 'PALAGIC SORIN-MIRCEA', 'PETRANEK IVAN', 'PICHLER Maximilian', 'RACZ LASZLO BALINT', 'REBEKIC Vlatko', 
-                'RISTIC Sretko', 'Saibl Klaus', 'SALA STANISLAV', 'SEBÖK ROBERT', 'SIMKO RADEK', 'VARGA ARPAD', 'VIASZ-KADI IMRE',
-                'VIDA ÁDÁM', 'VYBOH Jaroslav', 'Weidinger Christian', 'WEIDINGER THOMAS', 'ZICKBAUER Gerald', 'ZSAKOVICS Adrian',],
-                }
-            
-
-            info_gb = {
-                'Gebietsbetreuer' : ['ADAMOVIC LUBOMIR', 'AKRAP Ivica', 'AMBRUS DOREL', 'BATISTA ', 'BOGAR ADAM', 'FRATRIK Anton', 'GALAVITS PATRIK',
-                'GAZICA Ivica', 'GHOTRA GURVINDER SINGH', 'HUMER Sven Sebastian', 'IZER PETER', 'JOZSA ROLAND', 'JURACKA MIROSLAV', 'KÄFFER Dietmar',
-                'Klavik Kurt', 'KOBIDA ROMAN', 'KRUK Maciej', 'KUBES PAVEL', 'LAPOSA MIKLOS', 'Lastro Marko', 'LIPKA ZOLTAN', 
-                'LOBODAS MAREK', 'Lubinski Stanislaw', 'MAYER ', 'MORAR Catalin', 'MÜLLNER MARIO', 'NAGY ZSOLT', 'NAIRZ MICHAEL',
-                    'NIEFERGALL GERALD', 'PALAGIC SORIN-MIRCEA', 'PETRANEK IVAN', 'PICHLER Maximilian', 'RACZ LASZLO BALINT', 'REBEKIC Vlatko', 
-                'RISTIC Sretko', 'Saibl Klaus', 'SALA STANISLAV', 'SEBÖK ROBERT', 'SIMKO RADEK', 'VARGA ARPAD', 'VIASZ-KADI IMRE',
-                'VIDA ÁDÁM', 'VYBOH Jaroslav', 'Weidinger Christian', 'WEIDINGER THOMAS', 'ZICKBAUER Gerald', 'ZSAKOVICS Adrian', 'KARL Elisabeth', 'SZUPPIN Bianca',
-                'PODMAJERSKY Viktor', 'IVANIC Roman', 'DUSEK Petr', 'PAYR FLORIAN', 'Vergeiner Fabian'],
-
-                'Filialleiter' : ['HINTERWALLNER PATRICK', 'KAJDIC Muhamed', 'Neger Helmut', 'ÖZTÜRK TOLGA', 
-                'RISTIC ', 'STAUDINGER FRIEDRICH', 'STEIDL ANDREAS', 'WINKLER Christian', 'Vergeiner Fabian'],
-
-                'Regionalleiter' : ['BAYER SIEGFRIED', 'KLAMBAUER Erwin', 'SCHÖPF OTMAR'],
-                }
-            
-            data = process_data(special_dataframes, fixed_branches, target_values, names_to_remove)
+            data = prepare_benchmark_data(special_dataframes, fingerprint, KONFIG, KONFIG.versions['benchmark'])
 
             col1, col2 = st.columns(2)
             with col1:
-                filial_filter = sorted(data[data['FILIALE'].isin(['Fil01', 'Fil02', 'Fil03', 'Fil05', 
-                                                                'Fil06', 'Fil07', 'Fil08', 'Fil09', 
-                                                                'Fil10', 'Fil13', 'Fil15'])]['FILIALE'].unique())
+                filial_filter = sorted(data[data['FILIALE'].isin(FILIAL_WHITELIST)]['FILIALE'].unique())
                 selected_branches = st.multiselect("Filiale:", options=filial_filter)
                 if selected_branches:
                     data = data[data['FILIALE'].isin(selected_branches)]
@@ -951,340 +1351,38 @@ if files:
                 value_filter = st.selectbox('Werte:', ['Numerisch', 'Prozentual'])
 
             # die Chartdaten
-            chart_data = data.groupby('FILIALE')[['IST', 'DIFF', 'SOLL WERT']].sum().reset_index()
-            chart_data['DIFF'] = chart_data['DIFF'].abs().round(0)
-
-            chart_data['100%'] = 100
-
-            # Berechnung der prozentualen Abweichung
-            chart_data['DIFF_prozent'] = (chart_data['DIFF'] / chart_data['SOLL WERT']) * 100
-            
-            # Berechnung der beiden Balken
-            chart_data['Abweichung'] = chart_data['DIFF_prozent']
-            chart_data['Basis'] = chart_data.apply(
-                lambda row: 100 - row['DIFF_prozent'] if row['IST'] < row['SOLL WERT'] else 100,
-                axis=1
-            ).round(1)
-            chart_data['Basis'] = chart_data['Basis'].apply(lambda x: f"{x}%").round(1)
-            
-            chart_data['Zusatz'] = chart_data.apply(
-                lambda row: row['DIFF_prozent'],
-                axis=1
-            )
-            # Gesamtübersicht erstellen
-            overview_data = data.groupby('FILIALE').agg({
-                'IST': 'sum',
-                'SOLL WERT': 'sum',
-                'DIFF': lambda x: abs(sum(x))
-            }).reset_index()
-
-            # Berechnung für das Gesamtdiagramm
-            total_ist = overview_data['IST'].sum()
-            total_soll = overview_data['SOLL WERT'].sum()
-            total_diff = abs(total_ist - total_soll)
-
-            overview_chart_data = pd.DataFrame({
-                'FILIALE': ['Gesamt'],
-                'IST': [total_ist],
-                'SOLL WERT': [total_soll],
-                'DIFF': [total_diff]
-            })
-
-            overview_chart_data['DIFF_prozent'] = (overview_chart_data['DIFF'] / overview_chart_data['SOLL WERT']) * 100
-            overview_chart_data['Abweichung'] = overview_chart_data['DIFF_prozent']
-            overview_chart_data['100%'] = 100
-
-            # Berechnung der Basis für das Gesamtdiagramm
-            overview_chart_data['Basis'] = overview_chart_data.apply(
-                lambda row: 100 - row['DIFF_prozent'] if row['IST'] < row['SOLL WERT'] else 100,
-                axis=1
-            ).round(1)
-            overview_chart_data['Basis'] = overview_chart_data['Basis'].apply(lambda x: f"{x}%")
-
-            overview_chart_data['Zusatz'] = overview_chart_data['DIFF_prozent']
+            chart_data = benchmark_chart_data(data)
+            overview_chart_data = benchmark_overview_data(chart_data)
 
             # Gesamtübersicht Figure erstellen
-            overview_fig = go.Figure()
-
-            if value_filter == 'Prozentual':
-                overview_chart_data['label'] = ((overview_chart_data['IST'] - overview_chart_data['SOLL WERT']) / overview_chart_data['SOLL WERT'] * 100).round(1)
-                overview_chart_data['label'] = overview_chart_data['label'].apply(lambda x: f"{'+' if x > 0 else ''}{x}%")
-                
-                overview_chart_data['y_labels'] = overview_chart_data.apply(
-                    lambda row: f"{row['FILIALE']} - Soll: {row['SOLL WERT']:,.0f}".replace(',', '.'),
-                    axis=1
-                )
-                
-                # Basis-Balken für Gesamtübersicht
-                overview_basis_bar = go.Bar(
-                    x=overview_chart_data['Basis'],
-                    y=overview_chart_data['y_labels'],
-                    name='Basis',
-                    orientation='h',
-                    showlegend=False,
-                    marker_color=overview_chart_data.apply(
-                        lambda row: '#2E8B09' if row['IST'] > row['SOLL WERT'] else '#D20103',
-                        axis=1,
-                    ),
-                    text=overview_chart_data.apply(
-                        lambda row: row['Basis'] if row['IST'] < row['SOLL WERT'] else '',
-                        axis=1
-                    ),
-                    textposition='auto',
-                    textfont=dict(
-                        color='white',
-                        size=15
-                    )
-                )
-                
-                # Zusatz-Balken für Gesamtübersicht
-                overview_zusatz_bar = go.Bar(
-                    x=overview_chart_data['Zusatz'],
-                    y=overview_chart_data['y_labels'],
-                    name='Zusatz',
-                    orientation='h',
-                    showlegend=False,
-                    marker_color=overview_chart_data.apply(
-                        lambda row: '#9CD884' if row['IST'] >= row['SOLL WERT'] else '#E49D9D',
-                        axis=1
-                    ),
-                    text=overview_chart_data.apply(
-                        lambda row: row['label'],
-                        axis=1
-                    ),
-                    textposition='outside',
-                    textfont=dict(
-                        color=overview_chart_data.apply(
-                            lambda row: 'red' if row['IST'] <= row['SOLL WERT'] else 'green',
-                            axis=1,
-                        ),
-                        size=15,
-                    ),
-                    cliponaxis=True
-                )
-                
-                overview_fig.add_trace(overview_basis_bar)
-                overview_fig.add_trace(overview_zusatz_bar)
-                
-            else:
-                overview_chart_data['IST_bereinigt'] = overview_chart_data.apply(
-                    lambda row: row['IST'] - row['DIFF'] if row['IST'] > row['SOLL WERT'] else row['IST'],
-                    axis=1
-                )
-                
-                overview_chart_data['y_labels'] = overview_chart_data.apply(
-                    lambda row: f"{row['FILIALE']} - Soll: {row['SOLL WERT']:,.0f}".replace(',', '.'),
-                    axis=1
-                )
-                
-                # IST-Balken für Gesamtübersicht
-                overview_ist_bar = go.Bar(
-                    x=overview_chart_data['IST_bereinigt'],
-                    y=overview_chart_data['y_labels'],
-                    name='IST',
-                    orientation='h',
-                    showlegend=False,
-                    marker_color=overview_chart_data.apply(
-                        lambda row: '#2E8B09' if row['IST'] > row['SOLL WERT'] else '#D20103',
-                        axis=1
-                    ),
-                    text=overview_chart_data.apply(
-                        lambda row: '{:,.0f}'.format(row['IST']).replace(',', '.') if row['IST'] < row['SOLL WERT'] else '',
-                        axis=1
-                    ),
-                    textposition='auto',
-                    textfont=dict(
-                        color='white',
-                        size=15
-                    )
-                )
-                
-                # DIFF-Balken für Gesamtübersicht
-                overview_diff_bar = go.Bar(
-                    x=overview_chart_data['DIFF'],
-                    y=overview_chart_data['y_labels'],
-                    name='SOLL',
-                    orientation='h',
-                    showlegend=False,
-                    marker_color=overview_chart_data.apply(
-                        lambda row: '#9CD884' if row['IST'] >= row['SOLL WERT'] else '#E49D9D',
-                        axis=1
-                    ),
-                    text=overview_chart_data.apply(
-                        lambda row: f"{int(row['IST']):,}   (+ <span style='color:green'>{int(row['DIFF']):,}</span> Abw.)" if row['IST'] >= row['SOLL WERT'] else f"- <span style='color:red'>{int(row['DIFF']):,}</span> Abw.",
-                        axis=1
-                    ),
-                    textposition='outside',
-                    textfont=dict(
-                        color=overview_chart_data.apply(
-                            lambda row: 'black' if row['IST'] >= row['SOLL WERT'] else 'red',
-                            axis=1,
-                        ),
-                        size=15
-                    ),
-                    cliponaxis=False
-                )
-                
-                overview_fig.add_trace(overview_ist_bar)
-                overview_fig.add_trace(overview_diff_bar)
-                
-                # Vertikale Linie für SOLL WERT
-                for idx, row in overview_chart_data.iterrows():
-                    overview_fig.add_shape(
-                        type='line',
-                        x0=row['SOLL WERT'],
-                        x1=row['SOLL WERT'],
-                        y0=idx-0.4,
-                        y1=idx+0.4,
-                        line=dict(
-                            color='red',
-                            width=2,
-                            dash='dash'
-                        )
-                    )
-
-            # Layout für Gesamtübersicht
-            overview_fig.update_layout(
-                barmode='stack',
-                yaxis_tickangle=0,
-                title='Benchmark Gesamt',
-                xaxis_title='Kontrollen',
-                yaxis_title='Gesamt',
-                height=250,
-                width=1400,
-                margin=dict(
-                    l=0,
-                    r=150,
-                    t=70,
-                    b=25
-                ),
-                xaxis=dict(
-                    automargin=True,
+            overview_fig = FIGURE_CACHE.get_or_build(
+                figure_key('benchmark', fingerprint, KONFIG.versions['benchmark'], set(selected_branches), value_filter),
+                lambda: build_benchmark_figure(
+                    overview_chart_data,
+                    value_filter,
+                    title='Benchmark Gesamt',
+                    yaxis_title='Gesamt',
+                    height=250,
+                    width=1400,
+                    margin=dict(l=0, r=150, t=70, b=25),
                 ),
-                yaxis=dict(
-                    automargin=True
-                )
             )
 
-            # Horizontale Linie bei 100% für prozentuale Ansicht
-            if value_filter == 'Prozentual':
-                overview_fig.add_shape(
-                    type='line',
-                    x0=100,
-                    x1=100,
-                    y0=-0.5,
-                    y1=len(overview_chart_data['FILIALE'])-0.5,
-                    line=dict(
-                        color='red',
-                        width=2,
-                        dash='dash'
-                    )
-                )
-
             # Anzeigen der Gesamtübersicht
             st.plotly_chart(overview_fig, use_container_width=False)
 
 
             st.markdown('---')
 
-            fig = go.Figure()
-
             if value_filter == 'Prozentual':
-                chart_data['label'] = ((chart_data['IST'] - chart_data['SOLL WERT']) / chart_data['SOLL WERT'] * 100).round(1)
-                chart_data['label'] = chart_data['label'].apply(lambda x: f"{'+' if x > 0 else ''}{x}%")
-
-                chart_data['y_labels'] = chart_data.apply(
-                    lambda row: f"{row['FILIALE']} - Soll: {row['SOLL WERT']:,.0f}".replace(',', '.'),
-                    axis=1
-                )
-                # Basis-Balken (100% oder weniger)
-                basis_bar = go.Bar(
-                    x=chart_data['Basis'],
-                    y=chart_data['y_labels'],
-                    name='Basis',
-                    orientation='h',
-                    showlegend=False,
-                    marker_color=chart_data.apply(
-                        lambda row: '#2E8B09' if row['IST'] > row['SOLL WERT'] else '#D20103',
-                        axis=1,
-                    ),
-                    # Text nur anzeigen, wenn IST < SOLL WERT
-                    text=chart_data.apply(
-                        lambda row: row['Basis'] if row['IST'] < row['SOLL WERT'] else '',
-                        axis=1
-                    ),
-                    textposition='auto',
-                    textfont=dict(
-                        color='white',
-                        size=15
-                    )
-                )
-                
-                # Zusatz-Balken (nur bei positiver Abweichung)
-                zusatz_bar = go.Bar(
-                    x=chart_data['Zusatz'],
-                    y=chart_data['y_labels'],
-                    name='Zusatz',
-                    orientation='h',
-                    showlegend=False,
-                    marker_color=chart_data.apply(
-                        lambda row: '#9CD884' if row['IST'] >= row['SOLL WERT'] else '#E49D9D',
-                        axis=1
-                    ),
-                    text=chart_data.apply(
-                        lambda row: row['label'] if row['IST'] >= row['SOLL WERT'] else row['label'],
-                        axis=1
-                    ),
-                    textposition='outside',
-                    textfont=dict(
-                        color=chart_data.apply(
-                        lambda row: 'red' if row['IST'] <= row['SOLL WERT'] else 'green',
-                        axis=1,
-                        ),
-                        size=15,
-                    ),
-                    cliponaxis=True
-                )
-                
-                fig.add_trace(basis_bar)
-                fig.add_trace(zusatz_bar)
-
-                fig.update_layout(
-                    barmode='stack',
-                    yaxis_tickangle=0,
+                fig = build_benchmark_figure(
+                    chart_data,
+                    value_filter,
                     title='Benchmark Visualisierung',
-                    xaxis_title='Kontrollen',
                     yaxis_title='Filiale',
                     height=600,
-                    width=1200,  
-                    margin=dict(
-                        l=0,  
-                        r=50,  
-                        t=70,  
-                        b=25   
-                    ),
-                    xaxis=dict(
-                        automargin=True,
-                        
-                    ),
-                    yaxis=dict(
-                        automargin=True
-                    )
-                )
-
-
-                # Fügen Sie eine horizontale Linie bei 100% hinzu
-                fig.add_shape(
-                    type='line',
-                    x0=100,
-                    x1=100,
-                    y0=-0.5,
-                    y1=len(chart_data['FILIALE'])-0.5,
-                    line=dict(
-                        color='red',
-                        width=2,
-                        dash='dash'
-                    )
+                    width=1200,
+                    margin=dict(l=0, r=50, t=70, b=25),
                 )
 
                 col1, col2 = st.columns([2.5,2])
@@ -1309,7 +1407,7 @@ if files:
 
                     def filter_data(table_filter, excluded_names):
                         if table_filter == 'RL&FL':
-                            filtered = table_display[table_display['ERFASSER'].isin(info_gb['Filialleiter'] + info_gb['Regionalleiter'])]
+                            filtered = table_display[table_display['ERFASSER'].isin(info_gb['Filialleiter'] | info_gb['Regionalleiter'])]
                             filtered = filtered.sort_values(by='⌀Kontrollen', ascending=False)
                         elif table_filter == 'Top 10':
                             # Filtere erst die Gebietsbetreuer und schließe dann die ausgewählten Namen aus
@@ -1366,104 +1464,16 @@ if files:
                     st.dataframe(table_display, use_container_width=True, height=table_height)
                 
             else:
-                chart_data['IST_bereinigt'] = chart_data.apply(
-                    lambda row: row['IST'] - row['DIFF'] if row['IST'] > row['SOLL WERT'] else row['IST'],
-                    axis=1
-                )
-                chart_data['y_labels'] = chart_data.apply(
-                    lambda row: f"{row['FILIALE']} - Soll: {row['SOLL WERT']:,.0f}".replace(',', '.'),
-                    axis=1
-                )
-                # numerische Darstellung bleibt unverändert
-                ist_bar = go.Bar(
-                    x=chart_data['IST_bereinigt'],
-                    y=chart_data['y_labels'],
-                    name='IST',
-                    orientation='h',
-                    showlegend=False,
-                    marker_color=chart_data.apply(
-                        lambda row: '#2E8B09' if row['IST'] > row['SOLL WERT'] else '#D20103',
-                        axis=1
-                    ),
-                    text=chart_data.apply(
-                        lambda row: '{:,.0f}'.format(row['IST']).replace(',', '.') if row['IST'] < row['SOLL WERT'] else '',
-                        axis=1
-                    ),
-                    textposition='auto',
-                    textfont=dict(
-                        color='white',
-                        size=15
-                    )
-                )
-                
-                diff_bar = go.Bar(
-                    x=chart_data['DIFF'],
-                    y=chart_data['y_labels'],
-                    name='SOLL',
-                    orientation='h',
-                    showlegend=False,
-                    marker_color=chart_data.apply(
-                        lambda row: '#9CD884' if row['IST'] >= row['SOLL WERT'] else '#E49D9D',
-                        axis=1
-                    ),
-                    text=chart_data.apply(
-                        lambda row: f"{int(row['IST']):,}   (+ <span style='color:green'>{int(row['DIFF']):,}</span> Abw.)" if row['IST'] >= row['SOLL WERT'] else f"- <span style='color:red'>{int(row['DIFF']):,}</span> Abw.",
-                        axis=1
-                    ),
-                    textposition='outside',
-                    textfont=dict(
-                        color=chart_data.apply(
-                            lambda row: 'black' if row['IST'] >= row['SOLL WERT'] else 'red',
-                            axis=1,  
-                        ),
-                        size=15
-                    ),
-                    cliponaxis=False
-                )
-                
-                fig.add_trace(ist_bar)
-                fig.add_trace(diff_bar)
-                
-
-                for idx, row in chart_data.iterrows():
-                    fig.add_shape(
-                        type='line',
-                        x0=row['SOLL WERT'],
-                        x1=row['SOLL WERT'],
-                        y0=idx-0.4,
-                        y1=idx+0.4,
-                        line=dict(
-                            color='red',
-                            width=2,
-                            dash='dash'
-                        )
-                    )
-                    
-                    
-                fig.update_layout(
-                    barmode='stack',
-                    yaxis_tickangle=0,
+                fig = build_benchmark_figure(
+                    chart_data,
+                    value_filter,
                     title='Benchmark Visualisierung',
-                    xaxis_title='Kontrollen',
                     yaxis_title='Filiale',
                     height=600,
                     width=1400,
-                    margin=dict(
-                        l=0,  # linker Rand
-                        r=200,  # rechter Rand
-                        t=70,  # oberer Rand
-                        b=50   # unterer Rand
-                    ),
-                    xaxis=dict(
-                        automargin=True,
-                        
-                    ),
-                    yaxis=dict(
-                        automargin=True
-                    )
+                    margin=dict(l=0, r=200, t=70, b=50),
                 )
-                                
-                
+
                 col1, col2 = st.columns([2.5,1.6])
                 with col1:
                     st.plotly_chart(fig, use_container_width=False)
@@ -1480,7 +1490,7 @@ if files:
 
                     def filter_data(table_filter, excluded_names):
                         if table_filter == 'RL&FL':
-                            filtered = table_display[table_display['ERFASSER'].isin(info_gb['Filialleiter'] + info_gb['Regionalleiter'])]
+                            filtered = table_display[table_display['ERFASSER'].isin(info_gb['Filialleiter'] | info_gb['Regionalleiter'])]
                             filtered = filtered.sort_values(by='⌀Kontrollen', ascending=False)
                         elif table_filter == 'Top 10':
                             filtered = table_display[
@@ -1536,20 +1546,24 @@ if files:
                     def export_rl_fl_data(data):
                         """
                         Exports the data for Regionalleiter and Filialleiter to an Excel file.
+                        Die Datei wird erst auf Anforderung im Hintergrund erstellt.
                         
                         Parameters:
                         data (pandas.DataFrame): The original data DataFrame.
                         """
-                        filtered_df = data[data['ERFASSER'].isin(info_gb['Filialleiter'] + info_gb['Regionalleiter'])]
-                        
-                        # Spalte "100%" löschen
-                        filtered_df = filtered_df.drop('100%', axis=1)
-                        
-                        excel_data = convert_df_to_excel(filtered_df)
+                        # Daten beim Anfordern binden - der Export läuft in einem anderen Thread
+                        def build(progress, data=data, names=info_gb['Filialleiter'] | info_gb['Regionalleiter']):
+                            filtered_df = data[data['ERFASSER'].isin(names)]
+                            
+                            # Spalte "100%" löschen
+                            filtered_df = filtered_df.drop('100%', axis=1)
+                            return convert_df_to_excel(filtered_df, progress)
+
                         prev_month = (datetime.now() - timedelta(days=30)).strftime("%m%Y")
-                        st.download_button(
+                        lazy_download_button(
                             label="Rohdaten RL&FL",
-                            data=excel_data,
+                            job_key=figure_key('export_rl_fl', fingerprint, KONFIG.versions['benchmark'], set(selected_branches)),
+                            build=build,
                             file_name=f'Filialbenchmark_RL_FL_{prev_month}.xlsx',
                             mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
                             key='download_button_rl_fl'
@@ -1558,49 +1572,38 @@ if files:
                     def export_complete_data(data):
                         """
                         Exports the complete, unfiltered data to an Excel file.
+                        Die Datei wird erst auf Anforderung im Hintergrund erstellt.
                         
                         Parameters:
                         data (pandas.DataFrame): The original data DataFrame.
                         """
-                        # Spalte "100%" löschen
-                        data = data.drop('100%', axis=1)
-                        
-                        excel_data = convert_df_to_excel(data)
+                        def build(progress, data=data):
+                            # Spalte "100%" löschen
+                            return convert_df_to_excel(data.drop('100%', axis=1), progress)
+
                         prev_month = (datetime.now() - timedelta(days=30)).strftime("%m%Y")
-                        st.download_button(
+                        lazy_download_button(
                             label="Rohdaten Export",
-                            data=excel_data,
+                            job_key=figure_key('export_complete', fingerprint, KONFIG.versions['benchmark'], set(selected_branches)),
+                            build=build,
                             file_name=f'Filialbenchmark_{prev_month}.xlsx',
                             mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
                             key='download_button_complete'
                         )
 
-                    def convert_df_to_excel(df):
+                    def convert_df_to_excel(df, progress=None):
                         """
                         Converts a DataFrame to an Excel file in-memory.
                         
                         Parameters:
                         df (pandas.DataFrame): The DataFrame to be exported.
+                        progress (callable): Optional, receives the progress (0-1).
                         
                         Returns:
                         bytes: The Excel file data in bytes.
                         """
-                        output = BytesIO()
-                        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                            df.to_excel(writer, sheet_name='Rohdaten', index=False)
-                            
-                            # Automatische Spaltenbreiten-Anpassung
-                            worksheet = writer.sheets['Rohdaten']
-                            for idx, col in enumerate(df.columns):
-                                series = df[col]
-                                max_len = max(
-                                    series.astype(str).map(len).max(),  # Länge der Daten
-                                    len(str(series.name))  # Länge der Überschrift
-                                ) + 1  # extra Platz
-                                worksheet.set_column(idx, idx, max_len)
-                        
-                        processed_data = output.getvalue()
-                        return processed_data
+                        # Zeilenweise im constant_memory-Modus, Spaltenbreiten aus Stichprobe/min-max
+                        return dataframe_to_xlsx(df, sheet_name='Rohdaten', progress=progress)
 
                     # Annahme: 'data' ist das ursprüngliche DataFrame
                     col1, col2 = st.columns(2)
@@ -1627,135 +1630,68 @@ if files:
             transporte_df = monthly_dfs['Kostenstelle']
             spitze_df = monthly_dfs['dbStueck']
 
+            monthly_summary = prepare_monthly_summary(monthly_dfs, fingerprint)
+
+            # Eine Arbeitsmappe mit allen Monatsdateien, einmal je Upload erstellt
+            if any(monthly_dfs.values()):
+                prev_month = (datetime.now() - timedelta(days=30)).strftime("%m%Y")
+                lazy_download_button(
+                    label="Monatsbericht Export",
+                    job_key=figure_key('monatsbericht', fingerprint),
+                    build=lambda progress, monthly_dfs=monthly_dfs, summary=monthly_summary: build_monthly_workbook(monthly_dfs, progress, summary),
+                    file_name=f'Monatsbericht_{prev_month}.xlsx',
+                    mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                    key='download_button_monatsbericht'
+                )
+
 
             col1, col2 = st.columns(2)
             with col2:
                 if abzüge_df:
-                    for i, df in enumerate(abzüge_df):
-                        st.subheader("Abzüge:")
-
-                        pivot_table_abzug = df.pivot_table(index='FILIALNAME',values=['ABZUG', 'AUSZAHLBEMERKUNG'], aggfunc={'ABZUG': 'sum', 'AUSZAHLBEMERKUNG' : 'count'}).reset_index()
-
-                        st.write(pivot_table_abzug)
+                    # ABZUG-Summe und Anzahl je Filiale über alle Dateien
+                    st.subheader("Abzüge:")
+                    st.write(monthly_summary.abzuege)
                 
                 
             with col1:
-                def convert_df_to_excel(filtered_df, pivot_table_all):
-                    """
-                    Converts a DataFrame and a pivot table DataFrame to a multi-sheet Excel file with a pivot table.
-                    
-                    Parameters:
-                    filtered_df (pandas.DataFrame): The main DataFrame to be exported.
-                    pivot_table_all (pandas.DataFrame): The pivot table DataFrame to be exported.
-                    
-                    Returns:
-                    bytes: The Excel file as a byte stream.
-                    """
-                    # Create a new Excel file in memory
-                    excel_bytes = BytesIO()
-                    with pd.ExcelWriter(excel_file, engine='xlsxwriter') as writer:
-                        # Write the main DataFrame to the first sheet
-                        filtered_df.to_excel(writer, sheet_name='Sondercodes', index=False)
-                        
-                        # Create the pivot table on the second sheet
-                        worksheet = writer.sheets['Sondercodes']
-                        pivot_table = worksheet.add_pivot_table('A1', pivot_table_all)
-                        pivot_table.add_field('FILIALENR', pivot_field_type='row')
-                        pivot_table.add_field('ZUSATZAUFWAND', pivot_field_type='data', function='sum')
-                        
-                        # Save the Excel file
-                        writer.save()
-                        
-                    # Return the Excel file as a byte stream
-                    return excel_bytes
-                
-                def add_excel_export(sondercodes_df):
-                    if sondercodes_df:
-                        for i, df in enumerate(sondercodes_df):
-                            st.subheader("Sondercodes:")
-
-                            filtered_df = df[~df['SONDERTYP'].between(700,799)]
-
-                            filtered_df['DATE'] = pd.to_datetime(df[['JAHR', 'MONAT']].assign(TAGE=1).rename(columns={'JAHR': 'year', 'MONAT': 'month', 'TAGE': 'day'}))
-
-                            # Keep the most recent entries based on the date
-                            max_date = filtered_df['DATE'].max()
-                            filtered_df = filtered_df[filtered_df['DATE'] == max_date]
-
-                            # Drop the DATE column
-                            filtered_df = filtered_df.drop(columns=['DATE'])
+                if sondercodes_df:
+                    st.subheader("Sondercodes:")
 
-                            # Create the pivot table
-                            pivot_table_all = filtered_df.pivot_table(index='FILIALENR', values='ZUSATZAUFWAND', aggfunc='sum').reset_index()
-
-                            # Add the Excel export button
-                            
-                            st.download_button(
-                                label="Download Excel file",
-                                data=excel_file,
-                                file_name="sondercodes_data.xlsx",
-                                mime="application/vnd.ms-excel"
-                            )
-
-                            if st.download_button(f"Export Sondercodes to Excel (Sheet 1: Data, Sheet 2: Pivot Table)"):
-                                excel_file = convert_df_to_excel(filtered_df, pivot_table_all)
-
-                        # Pivot-Tabelle für FILIALENR 1-15 erstellen
-                        pivot_table_uad = filtered_df[filtered_df['FILIALENR'].between(1, 15)].pivot_table(index='FILIALENR', values='ZUSATZAUFWAND', aggfunc='sum').reset_index()
-
-                        # Pivot-Tabelle für FILIALENR 51-65 erstellen
-                        pivot_table_adr = filtered_df[filtered_df['FILIALENR'].between(51, 65)].pivot_table(index='FILIALENR', values='ZUSATZAUFWAND', aggfunc='sum').reset_index()
-
-                        # Funktion zum Umbenennen der FILIALENR
-                        def rename_filialenr(filialenr):
-                            if filialenr <= 15:
-                                return f"Fil{filialenr:02d}"
-                            elif 51 <= filialenr <= 65:
-                                return f"Fil{(filialenr - 50):02d}"
-                            else:
-                                return f"Fil{filialenr:02d}"
-
-                        # Umbenennen der FILIALENR in den Pivot-Tabellen
-                        pivot_table_uad['FILIALENR'] = pivot_table_uad['FILIALENR'].apply(rename_filialenr)
-                        pivot_table_adr['FILIALENR'] = pivot_table_adr['FILIALENR'].apply(rename_filialenr)
-
-                        pivot_table_uad['ZUSATZAUFWAND'] = pivot_table_uad['ZUSATZAUFWAND'].apply(lambda x: f"{x:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
-                        pivot_table_adr['ZUSATZAUFWAND'] = pivot_table_adr['ZUSATZAUFWAND'].apply(lambda x: f"{x:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
+                    # ZUSATZAUFWAND je Filiale (neuester Monat je Datei, ohne SONDERTYP 700-799)
+                    pivot_table_uad = monthly_summary.sondercodes_uad.assign(
+                        ZUSATZAUFWAND=euro_text(monthly_summary.sondercodes_uad['ZUSATZAUFWAND']).to_numpy()
+                    )
+                    pivot_table_adr = monthly_summary.sondercodes_adr.assign(
+                        ZUSATZAUFWAND=euro_text(monthly_summary.sondercodes_adr['ZUSATZAUFWAND']).to_numpy()
+                    )
 
 
-                        col1, col2 = st.columns(2)
+                    col1, col2 = st.columns(2)
 
-                        with col1:
-                            st.write("Unadressiert:")
-                            st.write(pivot_table_uad)
-                        with col2:
-                            st.write("Adressiert:")
-                            st.write(pivot_table_adr)
+                    with col1:
+                        st.write("Unadressiert:")
+                        st.write(pivot_table_uad)
+                    with col2:
+                        st.write("Adressiert:")
+                        st.write(pivot_table_adr)
 
+            # Rohdaten seitenweise statt vollständig im Browser
             if verteilung_df:
-                for i, df in enumerate(verteilung_df):
-                    st.write(f"Verteilung {i+1}:")
-                    st.write(df)
+                raw_table_view("Verteilung", verteilung_df, fingerprint, key='monat_verteilung')
             if transporte_df:
-                for i, df in enumerate(transporte_df):
-                    st.write(f"Transporte {i+1}:")
-                    st.write(df)
-
+                raw_table_view("Transporte", transporte_df, fingerprint, key='monat_transporte')
             if spitze_df:
-                for i, df in enumerate(spitze_df):
-                    st.write(f"Spitze {i+1}:")
+                raw_table_view("Spitze", spitze_df, fingerprint, key='monat_spitze')
 
 
-                    st.write(df)
-
-            
-           
-
-      
-
-
-
-
-        
 else:                    
-    st.info("Bitte lade eine XLSX hoch, um zu beginnen.")
+    st.info("Bitte lade eine XLSX-, CSV-, Parquet- oder Feather-Datei hoch, um zu beginnen.")
+
+with figure_cache_box.container():
+    with st.expander("Diagramm-Cache"):
+        cache_stats = FIGURE_CACHE.stats()
+        st.caption(f"{cache_stats['Diagramme']} von {FIGURE_CACHE.max_entries} Diagrammen ({cache_stats['MB']:.1f} MB)")
+        st.caption(f"{cache_stats['Treffer']} Treffer, {cache_stats['Fehlzugriffe']} Fehlzugriffe, "
+                   f"{cache_stats['Verdrängt']} verdrängt")
+        if st.button("Diagramm-Cache leeren"):
+            FIGURE_CACHE.clear()
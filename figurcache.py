@@ -0,0 +1,92 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import date
+
+import plotly.io as pio
+
+# Begrenzter Cache für fertige Plotly-Diagramme (LRU).
+# Schlüssel: Daten-Fingerabdruck + normalisierter Filterzustand.
+# Gespeichert wird die serialisierte Figur (JSON), bei einem Treffer wird
+# sie direkt daraus geladen, ohne Daten oder Annotationen neu zu berechnen.
+
+FIGURE_CACHE_ENTRIES = 64
+
+
+def _normalize(value):
+    # Sets ohne Reihenfolge, Datum als Text - gleiche Filter ergeben denselben Schlüssel
+    if isinstance(value, (set, frozenset)):
+        return sorted(_normalize(v) for v in value)
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def figure_key(*parts):
+    """
+    Schlüssel aus Fingerabdruck und Filterzustand.
+    """
+    text = json.dumps(_normalize(parts), sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class FigurCache:
+    """
+    LRU-Cache für serialisierte Diagramme mit Treffer-/Fehlzugriffszählern.
+
+    Parameters:
+    max_entries (int): Anzahl Diagramme, danach wird das am längsten nicht genutzte verdrängt.
+    """
+
+    def __init__(self, max_entries=FIGURE_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_build(self, key, build):
+        """
+        Liefert das Diagramm zum Schlüssel; bei einem Fehlzugriff wird build() aufgerufen.
+        """
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if text is not None:
+            return pio.from_json(text)
+
+        fig = build()
+        text = fig.to_json()
+        with self._lock:
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return fig
+
+    def stats(self):
+        with self._lock:
+            size_mb = sum(len(text) for text in self._entries.values()) / 1024 ** 2
+            return {
+                'Diagramme': len(self._entries),
+                'Treffer': self.hits,
+                'Fehlzugriffe': self.misses,
+                'Verdrängt': self.evictions,
+                'MB': round(size_mb, 2),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
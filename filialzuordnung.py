@@ -0,0 +1,81 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+# Vorkompilierte Filialzuordnung über PLZ und Gebietsbetreuer.
+# Jede Version gilt ab ihrem Stichtag; Kontrollen werden mit der Version
+# zugeordnet, die zum Zeitpunkt von ERFASST gültig war.
+
+PLZ_ANZAHL = 10000  # PLZ 0000-9999
+
+
+class FilialZuordnung:
+    """
+    Zuordnungstabellen für alle Versionen.
+
+    Parameters:
+    versions (list): (gültig ab, PLZ-Mapping {Filiale: [PLZ]}, GB-Mapping {Filiale: [Namen]})
+    """
+
+    def __init__(self, versions):
+        versions = sorted(versions, key=lambda v: pd.Timestamp(v[0]))
+        self.filialen = sorted({f for _, plz_map, gb_map in versions for f in (*plz_map, *gb_map)})
+        code_of = {filiale: i for i, filiale in enumerate(self.filialen)}
+
+        self.starts = np.array([np.datetime64(pd.Timestamp(v[0]), 'ns') for v in versions])
+
+        # Dichte Tabelle Version x PLZ -> Filial-Code (-1 = keine Zuordnung)
+        self.plz_lookup = np.full((len(versions), PLZ_ANZAHL), -1, dtype=np.int16)
+        # Name -> Filial-Code je Version
+        self.gb_lookup = []
+        for k, (_, plz_map, gb_map) in enumerate(versions):
+            for filiale, plz_liste in plz_map.items():
+                self.plz_lookup[k, plz_liste] = code_of[filiale]
+            self.gb_lookup.append({name: code_of[filiale] for filiale, namen in gb_map.items() for name in namen})
+
+        self.version = hashlib.sha256(repr(versions).encode()).hexdigest()[:12]
+
+    def _version_index(self, erfasst):
+        # Kontrollen vor der ersten Version (oder ohne Datum) nutzen die erste bzw. letzte Version
+        erfasst = np.asarray(erfasst, dtype='datetime64[ns]')
+        idx = np.searchsorted(self.starts, erfasst, side='right') - 1
+        return np.clip(idx, 0, len(self.starts) - 1)
+
+    def _to_categorical(self, codes):
+        return pd.Categorical.from_codes(codes, categories=self.filialen)
+
+    def by_erfasser(self, erfasser, erfasst):
+        """
+        Feste Filiale je Gebietsbetreuer (NaN, wenn nicht zugeordnet).
+        """
+        erfasser = erfasser.astype('category')
+        names = erfasser.cat.categories
+        # Kleine Tabelle Version x Name; letzte Spalte (-1) für fehlende Namen
+        table = np.full((len(self.starts), len(names) + 1), -1, dtype=np.int16)
+        for k, lookup in enumerate(self.gb_lookup):
+            table[k, :-1] = [lookup.get(name, -1) for name in names]
+
+        codes = table[self._version_index(erfasst), erfasser.cat.codes.to_numpy()]
+        return pd.Series(self._to_categorical(codes), index=erfasser.index)
+
+    def by_plz(self, plz, erfasst, fallback):
+        """
+        Filiale je PLZ; Zeilen ohne passende PLZ behalten den Wert aus fallback.
+        """
+        if isinstance(plz.dtype, pd.CategoricalDtype):
+            # Nur die Kategorien umwandeln, nicht jede Zeile
+            werte = pd.to_numeric(pd.Series(plz.cat.categories), errors='coerce').to_numpy(dtype=float)
+            # Letzter Eintrag (NaN) für fehlende Werte mit Code -1
+            plz_num = np.append(werte, np.nan)[plz.cat.codes.to_numpy()]
+        else:
+            plz_num = pd.to_numeric(plz, errors='coerce').to_numpy(dtype=float)
+
+        valid = ~np.isnan(plz_num) & (plz_num >= 0) & (plz_num < PLZ_ANZAHL)
+        codes = np.full(len(plz_num), -1, dtype=np.int16)
+        codes[valid] = self.plz_lookup[self._version_index(erfasst)[valid], plz_num[valid].astype(np.int64)]
+
+        result = fallback.astype(object).to_numpy(copy=True)
+        hit = codes >= 0
+        result[hit] = np.asarray(self.filialen, dtype=object)[codes[hit]]
+        return pd.Series(result, index=plz.index, name=fallback.name)
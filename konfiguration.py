@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import NamedTuple
+
+import pandas as pd
+
+import zusatzinfo
+from filialzuordnung import FilialZuordnung, PLZ_ANZAHL
+
+# Konfiguration (Zusatzinfo-Listen, Filialen, Benchmark-Roster) aus einer JSON-Datei.
+# Die Datei wird beim Laden geprüft und in Lookup-Strukturen übersetzt.
+# Jeder Abschnitt hat eine eigene Version, damit nur die davon abhängigen
+# Caches neu berechnet werden.
+
+CONFIG_PATH = Path(os.environ.get('DATENTOOL_CONFIG', Path(__file__).with_name('konfiguration.json')))
+
+SECTIONS = ('zusatzinfos', 'filialen', 'benchmark')
+
+
+class Konfiguration(NamedTuple):
+    performance_zusatzinfos: frozenset
+    verteiler_zusatzinfos: tuple  # Reihenfolge ist Teil des Cache-Schlüssels
+    include_zusatzinfos: frozenset
+    removed_zusatzinfos: tuple
+    registry: tuple  # Position = Bit in ZUSATZINFO_MASK
+    filial_whitelist: frozenset
+    filial_zuordnung: FilialZuordnung
+    fixed_branches: dict  # Name -> feste Filiale (Reihenfolge wie in der Datei)
+    target_values: dict  # Name -> Soll-Wert
+    names_to_remove: frozenset
+    info_gb: dict  # Rolle -> Namen
+    versions: dict  # Abschnitt -> Hash
+
+
+def _section_version(*parts):
+    text = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(text.encode()).hexdigest()[:12]
+
+
+def _names(value, where):
+    if not isinstance(value, list) or not all(isinstance(name, str) for name in value):
+        raise ValueError(f"{where}: Liste von Texten erwartet")
+    return value
+
+
+def _name_lists(value, where):
+    if not isinstance(value, dict):
+        raise ValueError(f"{where}: Objekt mit Listen erwartet")
+    return {key: _names(names, f"{where}.{key}") for key, names in value.items()}
+
+
+def _unique_names(mapping, where):
+    # Jeder Name (bzw. jede PLZ) darf nur einer Filiale zugeordnet sein
+    seen = {}
+    for key, names in mapping.items():
+        for name in names:
+            if name in seen and seen[name] != key:
+                raise ValueError(f"{where}: '{name}' ist {seen[name]} und {key} zugeordnet")
+            seen[name] = key
+    return seen
+
+
+def compile_config(raw):
+    """
+    Prüft die eingelesene Konfiguration und übersetzt sie in Lookup-Strukturen.
+
+    Parameters:
+    raw (dict): Inhalt der JSON-Datei.
+
+    Returns:
+    Konfiguration: Sets, Name->Filiale und Name->Soll, Filialzuordnung und Abschnitts-Versionen.
+    """
+    if not isinstance(raw, dict):
+        raise ValueError("Konfiguration: Objekt erwartet")
+    missing = [section for section in SECTIONS if not isinstance(raw.get(section), dict)]
+    if missing:
+        raise ValueError(f"Konfiguration: fehlende oder ungültige Abschnitte {missing}")
+
+    # Zusatzinfos
+    infos = raw['zusatzinfos']
+    performance = _names(infos.get('performance'), 'zusatzinfos.performance')
+    verteiler = _names(infos.get('verteiler'), 'zusatzinfos.verteiler')
+    include = _names(infos.get('include'), 'zusatzinfos.include')
+    removed = _names(infos.get('entfernt'), 'zusatzinfos.entfernt')
+    registry = zusatzinfo.build_registry(performance, verteiler, include, removed)
+
+    # Filialen: Versionen mit Stichtag
+    filialen = raw['filialen']
+    whitelist = _names(filialen.get('whitelist'), 'filialen.whitelist')
+    versionen = filialen.get('versionen')
+    if not isinstance(versionen, list) or not versionen:
+        raise ValueError("filialen.versionen: mindestens eine Version erwartet")
+
+    zuordnung_versions = []
+    for i, version in enumerate(versionen):
+        where = f"filialen.versionen[{i}]"
+        if not isinstance(version, dict) or not isinstance(version.get('plz', {}), dict):
+            raise ValueError(f"{where}: Objekt mit gueltig_ab, plz und gebietsbetreuer erwartet")
+        try:
+            start = pd.Timestamp(version['gueltig_ab'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"{where}.gueltig_ab: Datum erwartet") from None
+        plz_map = version.get('plz', {})
+        for filiale, plz_liste in plz_map.items():
+            if not isinstance(plz_liste, list) or not all(
+                isinstance(plz, int) and 0 <= plz < PLZ_ANZAHL for plz in plz_liste
+            ):
+                raise ValueError(f"{where}.plz.{filiale}: PLZ zwischen 0 und {PLZ_ANZAHL - 1} erwartet")
+        _unique_names(plz_map, f"{where}.plz")
+        gb_map = _name_lists(version.get('gebietsbetreuer', {}), f"{where}.gebietsbetreuer")
+        _unique_names(gb_map, f"{where}.gebietsbetreuer")
+        zuordnung_versions.append((start, plz_map, gb_map))
+
+    # Benchmark: Roster der aktuell gültigen Version, Soll-Werte und Rollen
+    benchmark = raw['benchmark']
+    names_to_remove = _names(benchmark.get('entfernen'), 'benchmark.entfernen')
+    target_lists = _name_lists(benchmark.get('soll_werte'), 'benchmark.soll_werte')
+    info_gb = _name_lists(benchmark.get('rollen'), 'benchmark.rollen')
+
+    target_values = {}
+    for value, names in target_lists.items():
+        try:
+            value = int(value)
+        except ValueError:
+            raise ValueError(f"benchmark.soll_werte: '{value}' ist keine Zahl") from None
+        for name in names:
+            # Erster Treffer gilt (wie bisher)
+            target_values.setdefault(name, value)
+
+    latest_gb = max(zuordnung_versions, key=lambda v: v[0])[2]
+    fixed_branches = {
+        name: filiale for filiale, names in latest_gb.items() for name in names
+    }
+
+    return Konfiguration(
+        performance_zusatzinfos=frozenset(performance),
+        verteiler_zusatzinfos=tuple(verteiler),
+        include_zusatzinfos=frozenset(include),
+        removed_zusatzinfos=tuple(removed),
+        registry=registry,
+        filial_whitelist=frozenset(whitelist),
+        filial_zuordnung=FilialZuordnung(zuordnung_versions),
+        fixed_branches=fixed_branches,
+        target_values=target_values,
+        names_to_remove=frozenset(names_to_remove),
+        info_gb={role: frozenset(names) for role, names in info_gb.items()},
+        versions={
+            'zusatzinfos': _section_version(raw['zusatzinfos']),
+            'filialen': _section_version(raw['filialen']),
+            # Das Roster kommt aus der aktuellen Filialen-Version
+            'benchmark': _section_version(raw['benchmark'], latest_gb),
+        },
+    )
+
+
+def load(path=None):
+    """
+    Liest und prüft die Konfigurationsdatei.
+
+    Raises:
+    OSError: Datei nicht lesbar.
+    ValueError: Ungültiges JSON oder ungültiger Inhalt.
+    """
+    with open(path or CONFIG_PATH, encoding='utf-8') as f:
+        raw = json.load(f)
+    return compile_config(raw)
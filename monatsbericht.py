@@ -0,0 +1,174 @@
+from io import BytesIO
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+from excelexport import DATE_FORMAT, write_frames
+
+# Monatsbericht: Auswertungen der Monatsdateien und Export als eine Arbeitsmappe.
+# Übersichten werden aus vorab aggregierten Daten geschrieben (xlsxwriter kann
+# keine nativen Pivot-Tabellen erzeugen), die Rohdaten je Typ auf einem eigenen Blatt.
+
+# Monatsspalte -> Blattname
+MONTHLY_SHEETS = {
+    'AUSZAHLBEMERKUNG': 'Abzüge',
+    'STUECK': 'Verteilung',
+    'ZUSATZAUFWAND': 'Sondercodes',
+    'Kostenstelle': 'Transporte',
+    'dbStueck': 'Spitze',
+}
+
+EURO_FORMAT = '#,##0.00'
+
+
+# Filialnummern der Sondercodes: 1-15 unadressiert, 51-65 adressiert (Fil01-Fil15)
+UNADRESSIERT = (1, 15)
+ADRESSIERT = (51, 65)
+
+
+class MonatsSummary(NamedTuple):
+    abzuege: pd.DataFrame  # FILIALNAME, ABZUG (Summe), AUSZAHLBEMERKUNG (Anzahl)
+    sondercodes_uad: pd.DataFrame  # FILIALENR ('FilNN'), ZUSATZAUFWAND
+    sondercodes_adr: pd.DataFrame
+
+
+def concat_type(frames, columns):
+    """
+    Alle Dateien eines Typs einmal zusammenführen (nur die benötigten Spalten).
+    Spalte DATEI = Position der Datei in der Liste.
+    """
+    if not frames:
+        return pd.DataFrame(columns=['DATEI', *columns])
+    return pd.concat(
+        [df[list(columns)].assign(DATEI=i) for i, df in enumerate(frames)],
+        ignore_index=True,
+    )
+
+
+def abzug_summary(frames):
+    """
+    Abzüge je Filiale: Summe ABZUG und Anzahl AUSZAHLBEMERKUNG (über alle Dateien).
+    """
+    df = concat_type(frames, ['FILIALNAME', 'ABZUG', 'AUSZAHLBEMERKUNG'])
+    return (
+        df.groupby('FILIALNAME')
+        .agg(ABZUG=('ABZUG', 'sum'), AUSZAHLBEMERKUNG=('AUSZAHLBEMERKUNG', 'count'))
+        .reset_index()
+    )
+
+
+def filial_label(filialenr):
+    """
+    FILIALENR -> 'FilNN'; adressierte Filialen (51-65) werden auf 1-15 abgebildet.
+    """
+    nr = np.asarray(filialenr, dtype=np.int64)
+    lo, hi = ADRESSIERT
+    nr = np.where((nr >= lo) & (nr <= hi), nr - (lo - 1), nr)
+    return np.char.mod('Fil%02d', nr)
+
+
+def sondercodes_summary(frames):
+    """
+    ZUSATZAUFWAND je Filiale, getrennt nach unadressiert (FILIALENR 1-15) und adressiert (51-65).
+    Je Datei zählt nur der neueste Monat (JAHR/MONAT), SONDERTYP 700-799 wird ausgelassen.
+
+    Returns:
+    tuple: (unadressiert, adressiert) mit Spalten FILIALENR ('FilNN') und ZUSATZAUFWAND.
+    """
+    df = concat_type(frames, ['SONDERTYP', 'JAHR', 'MONAT', 'FILIALENR', 'ZUSATZAUFWAND'])
+    df = df[~df['SONDERTYP'].between(700, 799)]
+
+    # Neuester Monat je Datei über eine Monatsnummer statt Datum
+    monat = df['JAHR'].astype(np.int64) * 12 + df['MONAT'].astype(np.int64)
+    df = df[monat == monat.groupby(df['DATEI']).transform('max')]
+
+    nr = df['FILIALENR'].to_numpy(dtype=np.int64)
+    art = np.select(
+        [(nr >= UNADRESSIERT[0]) & (nr <= UNADRESSIERT[1]), (nr >= ADRESSIERT[0]) & (nr <= ADRESSIERT[1])],
+        ['unadressiert', 'adressiert'],
+        default='',
+    )
+    keep = art != ''
+
+    # Ein groupby für beide Teile
+    totals = (
+        pd.DataFrame({
+            'ART': art[keep],
+            'FILIALENR': filial_label(nr[keep]),
+            'ZUSATZAUFWAND': df['ZUSATZAUFWAND'].to_numpy()[keep],
+        })
+        .groupby(['ART', 'FILIALENR'])['ZUSATZAUFWAND']
+        .sum()
+    )
+
+    def part(name):
+        if name not in totals.index.get_level_values('ART'):
+            return pd.DataFrame({'FILIALENR': pd.Series(dtype=object), 'ZUSATZAUFWAND': pd.Series(dtype=float)})
+        return totals.xs(name, level='ART').reset_index()
+
+    return part('unadressiert'), part('adressiert')
+
+
+def summarize(monthly_dfs):
+    """
+    Alle Übersichten des Monatsberichts (je Typ ein Durchlauf).
+    """
+    unadressiert, adressiert = sondercodes_summary(monthly_dfs.get('ZUSATZAUFWAND') or [])
+    return MonatsSummary(abzug_summary(monthly_dfs.get('AUSZAHLBEMERKUNG') or []), unadressiert, adressiert)
+
+
+def euro_text(values):
+    """
+    1234.5 -> '1.234,50'
+    """
+    return pd.Series(values).map('{:,.2f}'.format).str.translate(str.maketrans(',.', '.,'))
+
+
+def build_workbook(monthly_dfs, progress=None, summary=None):
+    """
+    Eine Arbeitsmappe für alle Monatsdateien (constant_memory).
+
+    Parameters:
+    monthly_dfs (dict): Monatsspalte -> Liste von DataFrames (wie aus load_data).
+    progress (callable): Optional, erhält den Fortschritt (0-1).
+    summary (MonatsSummary): Optional, bereits berechnete Übersichten.
+
+    Returns:
+    bytes: Die Excel-Datei.
+    """
+    output = BytesIO()
+    workbook = xlsxwriter.Workbook(output, {
+        'constant_memory': True,
+        'default_date_format': DATE_FORMAT,
+    })
+
+    summary = summary or summarize(monthly_dfs)
+
+    # Übersichten (klein) zuerst
+    if monthly_dfs.get('AUSZAHLBEMERKUNG'):
+        write_frames(workbook, [summary.abzuege], 'Übersicht Abzüge', num_formats={'ABZUG': EURO_FORMAT})
+
+    if monthly_dfs.get('ZUSATZAUFWAND'):
+        write_frames(workbook, [summary.sondercodes_uad], 'Sondercodes unadressiert', num_formats={'ZUSATZAUFWAND': EURO_FORMAT})
+        write_frames(workbook, [summary.sondercodes_adr], 'Sondercodes adressiert', num_formats={'ZUSATZAUFWAND': EURO_FORMAT})
+
+    # Rohdaten: ein Blatt je Typ, alle Dateien des Typs untereinander
+    typen = [(col, frames) for col, frames in monthly_dfs.items() if frames]
+    total = sum(len(df) for _, frames in typen for df in frames) or 1
+    done = 0
+    for col, frames in typen:
+        rows = sum(len(df) for df in frames)
+
+        def sheet_progress(anteil, done=done, rows=rows):
+            if progress is not None:
+                progress((done + anteil * rows) / total)
+
+        write_frames(workbook, frames, MONTHLY_SHEETS.get(col, col)[:31], progress=sheet_progress)
+        done += rows
+
+    if not typen:
+        workbook.add_worksheet('Monatsbericht')
+    workbook.close()
+    return output.getvalue()
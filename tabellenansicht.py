@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+# Seitenweise Ansicht großer Rohdaten-Tabellen (Monatsbericht).
+# Filtern und Sortieren liefern nur eine Zeilenreihenfolge (Positionen); für die
+# Anzeige wird daraus die sichtbare Seite mit den gewählten Spalten geschnitten.
+
+PAGE_SIZES = (25, 50, 100, 500)
+PAGE_SIZE = 50
+
+# Mögliche Filialspalten der Monatsdateien, in dieser Reihenfolge gesucht
+FILIAL_COLUMNS = ('FILIALNAME', 'FILIALE', 'FILIALENR')
+
+
+def filial_column(df):
+    """
+    Erste vorhandene Filialspalte oder None.
+    """
+    return next((col for col in FILIAL_COLUMNS if col in df.columns), None)
+
+
+def filial_summary(df):
+    """
+    Zeilenanzahl und Summen der Zahlenspalten je Filiale.
+
+    Returns:
+    pandas.DataFrame: Eine Zeile je Filiale (ZEILEN + Zahlenspalten) oder None ohne Filialspalte.
+    """
+    column = filial_column(df)
+    if column is None:
+        return None
+
+    numeric = [
+        col for col in df.select_dtypes(include='number').columns
+        if col != column and not pd.api.types.is_bool_dtype(df[col])
+    ]
+    grouped = df.groupby(column, observed=True, sort=True)
+    summary = grouped[numeric].sum() if numeric else pd.DataFrame(index=grouped.size().index)
+    summary.insert(0, 'ZEILEN', grouped.size())
+    return summary.reset_index()
+
+
+def filter_mask(values, text):
+    """
+    Zeilen, deren Wert text enthält (ohne Groß-/Kleinschreibung).
+    Bei Kategorien wird nur je Kategorie verglichen.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        matches = values.cat.categories.astype(str).str.contains(text, case=False, regex=False)
+        # Code -1 (fehlend) zeigt auf das angehängte False
+        return np.append(np.asarray(matches, dtype=bool), False)[values.cat.codes.to_numpy()]
+    return (values.notna() & values.astype(str).str.contains(text, case=False, regex=False)).to_numpy()
+
+
+def row_order(df, filter_column=None, filter_text='', sort_by=None, ascending=True):
+    """
+    Positionen der Zeilen nach Filter und Sortierung.
+
+    Parameters:
+    filter_column (str): Optional, Spalte für den Textfilter.
+    filter_text (str): Gesuchter Text; leer = kein Filter.
+    sort_by (str): Optional, Sortierspalte (stabil, fehlende Werte zuletzt).
+
+    Returns:
+    numpy.ndarray: Zeilenpositionen für df.iloc.
+    """
+    positions = np.arange(len(df))
+    if filter_column and filter_text:
+        positions = positions[filter_mask(df[filter_column], filter_text)]
+
+    if sort_by:
+        values = pd.Series(df[sort_by].to_numpy()[positions])
+        try:
+            order = values.sort_values(ascending=ascending, kind='stable', na_position='last').index
+        except TypeError:
+            # Gemischte Typen (z.B. Zahlen und Text aus Excel): nach der Textform sortieren
+            order = values.sort_values(
+                ascending=ascending, kind='stable', na_position='last',
+                key=lambda s: s.where(s.isna(), s.astype(str)),
+            ).index
+        positions = positions[order.to_numpy()]
+    return positions
+
+
+def page_count(rows, page_size):
+    return max(-(-rows // page_size), 1)
+
+
+def table_page(df, positions, page, page_size, columns=None):
+    """
+    Sichtbare Seite (1-basiert) mit den gewählten Spalten.
+    """
+    start = (page - 1) * page_size
+    rows = df.iloc[positions[start:start + page_size]]
+    if columns:
+        rows = rows[list(columns)]
+    return rows
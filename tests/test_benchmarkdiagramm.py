@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from benchmarkdiagramm import build_benchmark_figure
+from benchmarks.benchmarkdiagramm_bench import build_rowwise, sample_chart_data
+
+
+def as_list(values):
+    return np.asarray(values, dtype=object).tolist()
+
+
+def percent(values):
+    # Alte Basis-Werte sind Texte wie '95.3%'
+    return np.array([float(str(v).rstrip('%')) for v in values])
+
+
+@pytest.fixture
+def chart_data():
+    data = sample_chart_data(40, seed=1)
+    # Grenzfall IST == SOLL WERT
+    data.loc[0, 'IST'] = data.loc[0, 'SOLL WERT']
+    data.loc[0, 'DIFF'] = 0.0
+    return data
+
+
+@pytest.mark.parametrize('value_filter', ['Numerisch', 'Prozentual'])
+def test_columnwise_bars_match_rowwise(chart_data, value_filter):
+    alt = build_rowwise(chart_data, value_filter)
+    neu = build_benchmark_figure(chart_data, value_filter, height=600)
+
+    for alt_bar, neu_bar in zip(alt.data[:2], neu.data[:2]):
+        assert neu_bar.name == alt_bar.name
+        assert as_list(neu_bar.y) == as_list(alt_bar.y)
+        assert as_list(neu_bar.marker.color) == as_list(alt_bar.marker.color)
+        assert as_list(neu_bar.text) == as_list(alt_bar.text)
+        if isinstance(alt_bar.textfont.color, str):
+            assert neu_bar.textfont.color == alt_bar.textfont.color
+        else:
+            assert as_list(neu_bar.textfont.color) == as_list(alt_bar.textfont.color)
+
+    if value_filter == 'Prozentual':
+        np.testing.assert_allclose(np.asarray(neu.data[0].x, dtype=float), percent(alt.data[0].x))
+    else:
+        np.testing.assert_allclose(np.asarray(neu.data[0].x, dtype=float), np.asarray(alt.data[0].x, dtype=float))
+    np.testing.assert_allclose(np.asarray(neu.data[1].x, dtype=float), np.asarray(alt.data[1].x, dtype=float))
+
+
+def test_soll_markers_match_rowwise_shapes(chart_data):
+    alt = build_rowwise(chart_data, 'Numerisch')
+    neu = build_benchmark_figure(chart_data, 'Numerisch', height=600)
+
+    # Eine Shape je Filiale gegen einen Scatter-Trace mit je einem Marker
+    np.testing.assert_allclose(np.asarray(neu.data[2].x, dtype=float), [shape.x0 for shape in alt.layout.shapes])
+    assert as_list(neu.data[2].y) == as_list(alt.data[0].y)
@@ -0,0 +1,33 @@
+import io
+
+import pandas as pd
+
+import datenimport
+
+REGISTRY = ('VERTEILER', 'INFO')
+
+
+def to_parquet(df):
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+
+def test_parquet_with_categorical_kontrolle():
+    df = pd.DataFrame({
+        'ERFASST': ['01.02.2024 08:00:00', '01.02.2024 09:00:00', '02.02.2024 10:00:00'],
+        'GEBIET': ['1010A', '1020B', '1030C'],
+        'FILIALE': ['Fil01', 'Fil01', 'Fil02'],
+        'ERFASSER': ['A', 'B', 'C'],
+        'NAME/VT/ABNEHMER': ['X', 'Y', 'Z'],
+        'TYPE': ['T1', 'T1', 'T2'],
+        'KONTROLLE': pd.Categorical(['OK', 'NICHT_OK', 'OK']),
+        'ZUSATZINFO': ['VERTEILER', None, 'INFO'],
+    })
+
+    result = datenimport.parse_workbook('a.parquet', to_parquet(df), 'IST', ('STUECK',), REGISTRY, ['VERTEILER'])
+
+    assert result['error'] is None
+    parsed = result['df']
+    assert list(parsed['KONTROLLE']) == ['PERF. NICHT_OK', 'NICHT_OK', 'OK']
+    assert list(parsed[datenimport.KONTROLLE_RAW]) == ['OK', 'NICHT_OK', 'OK']
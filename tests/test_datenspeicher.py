@@ -0,0 +1,44 @@
+import pandas as pd
+
+import datenspeicher
+
+
+def monthly_file(filiale, abzug, monat=2):
+    return pd.DataFrame({
+        'FILIALNAME': [filiale],
+        'ABZUG': [abzug],
+        'AUSZAHLBEMERKUNG': ['x'],
+        'JAHR': [2024],
+        'MONAT': [monat],
+    })
+
+
+def test_two_files_for_one_month_are_both_loaded(tmp_path):
+    db = tmp_path / 'speicher.sqlite'
+    datenspeicher.append_file('h1', 'Abzuege_Fil01.xlsx', monthly_file('Fil01', 10.0), False, ['AUSZAHLBEMERKUNG'], db)
+    datenspeicher.append_file('h2', 'Abzuege_Fil02.xlsx', monthly_file('Fil02', 20.0), False, ['AUSZAHLBEMERKUNG'], db)
+
+    frames = datenspeicher.load_monthly(['AUSZAHLBEMERKUNG'], '2024-02-01', '2024-02-29', db)['AUSZAHLBEMERKUNG']
+
+    assert sorted(df['FILIALNAME'].iloc[0] for df in frames) == ['Fil01', 'Fil02']
+
+
+def test_reimport_of_same_file_replaces_older_import(tmp_path):
+    db = tmp_path / 'speicher.sqlite'
+    datenspeicher.append_file('h1', 'Abzuege.xlsx', monthly_file('Fil01', 10.0), False, ['AUSZAHLBEMERKUNG'], db)
+    datenspeicher.append_file('h2', 'Abzuege.xlsx', monthly_file('Fil01', 15.0), False, ['AUSZAHLBEMERKUNG'], db)
+
+    frames = datenspeicher.load_monthly(['AUSZAHLBEMERKUNG'], '2024-02-01', '2024-02-29', db)['AUSZAHLBEMERKUNG']
+
+    assert [df['ABZUG'].iloc[0] for df in frames] == [15.0]
+
+
+def test_files_are_selected_by_data_period(tmp_path):
+    db = tmp_path / 'speicher.sqlite'
+    datenspeicher.append_file('h1', 'Abzuege_Jan.xlsx', monthly_file('Fil01', 10.0, monat=1), False, ['AUSZAHLBEMERKUNG'], db)
+
+    februar = datenspeicher.load_monthly(['AUSZAHLBEMERKUNG'], '2024-02-01', '2024-02-29', db)['AUSZAHLBEMERKUNG']
+    januar = datenspeicher.load_monthly(['AUSZAHLBEMERKUNG'], '2024-01-01', '2024-01-31', db)['AUSZAHLBEMERKUNG']
+
+    assert februar == []
+    assert len(januar) == 1
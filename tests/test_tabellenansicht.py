@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+import tabellenansicht
+
+
+def test_row_order_sorts_mixed_types_by_text():
+    df = pd.DataFrame({'KOSTENSTELLE': pd.Series([20, 'B', 3, None, 'A'], dtype=object)})
+
+    positions = tabellenansicht.row_order(df, sort_by='KOSTENSTELLE')
+
+    assert list(df['KOSTENSTELLE'].iloc[positions]) == [20, 3, 'A', 'B', None]
+
+
+def test_row_order_filter_and_descending_sort():
+    df = pd.DataFrame({
+        'FILIALNAME': pd.Categorical(['Fil01', 'Fil02', 'Fil01', None]),
+        'STUECK': [5, 7, 9, 1],
+    })
+
+    positions = tabellenansicht.row_order(df, 'FILIALNAME', 'fil01', 'STUECK', ascending=False)
+
+    np.testing.assert_array_equal(positions, [2, 0])
+
+
+def test_table_page():
+    df = pd.DataFrame({'A': range(10), 'B': range(10)})
+    positions = np.arange(10)[::-1]
+
+    page = tabellenansicht.table_page(df, positions, page=2, page_size=4, columns=['A'])
+
+    assert list(page.columns) == ['A']
+    assert list(page['A']) == [5, 4, 3, 2]
+    assert tabellenansicht.page_count(10, 4) == 3
@@ -0,0 +1,33 @@
+import pandas as pd
+
+import zusatzinfo
+
+REGISTRY = ('OK', 'A', 'B')
+
+
+def baseline_counts(df, by):
+    # Bisherige Auszählung: explode + groupby + pivot
+    exploded = df.assign(ZUSATZINFO=df['ZUSATZINFO'].str.split()).explode('ZUSATZINFO').dropna(subset=['ZUSATZINFO'])
+    grouped = exploded.groupby(['ZUSATZINFO', by]).size().reset_index(name='COUNT')
+    return grouped.pivot(index='ZUSATZINFO', columns=by, values='COUNT').fillna(0).astype('int64')
+
+
+def test_count_by_matches_explode_for_repeated_codes():
+    df = pd.DataFrame({
+        'ZUSATZINFO': ['OK OK A', 'X A', 'B', None, 'X X'],
+        'TYPE': ['T1', 'T1', 'T2', 'T2', 'T1'],
+    })
+    mask, rest = zusatzinfo.encode(df['ZUSATZINFO'], REGISTRY)
+    df[zusatzinfo.MASK_COLUMN] = mask
+    df[zusatzinfo.REST_COLUMN] = rest
+
+    counts = zusatzinfo.count_by(df, 'TYPE', REGISTRY)
+    expected = baseline_counts(df, 'TYPE')
+
+    assert counts.index.is_unique
+    assert counts.loc['OK', 'T1'] == 2
+    pd.testing.assert_frame_equal(
+        counts.sort_index().sort_index(axis=1),
+        expected.sort_index().sort_index(axis=1),
+        check_names=False,
+    )
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+# Verlauf der Kontrollergebnisse über mehrere Monate.
+# Grundlage sind die Tageszählungen des Kontroll-Würfels: sie werden einmal zu einer
+# Tabelle mit Zeile = Tag und Spalte = (KONTROLLE, Eintrag) umgeformt, mit einem
+# einzigen resample auf Tag/Woche/Monat summiert und über ein gleitendes Fenster
+# zu Quoten verrechnet - ohne die Rohdaten je Periode neu zu filtern.
+
+# Auflösung -> resample-Regel (Perioden werden mit ihrem Beginn beschriftet)
+AUFLOESUNGEN = {
+    'Täglich': 'D',
+    'Wöchentlich': 'W-MON',
+    'Monatlich': 'MS',
+}
+
+
+def daily_counts(cube_slice, group_by_field, entities=None):
+    """
+    Kontrollen je Tag, Ergebnis und Eintrag.
+
+    Parameters:
+    cube_slice (pandas.DataFrame): Ausschnitt des Kontroll-Würfels (TAG, KONTROLLE, ANZAHL, group_by_field).
+    group_by_field (str): Spalte der Einträge (Filiale, Gebietsbetreuer, Zusteller).
+    entities (list): Optional, nur diese Einträge.
+
+    Returns:
+    pandas.DataFrame: Index TAG, Spalten (KONTROLLE, EINTRAG), Werte = Anzahl.
+    """
+    if entities is not None:
+        cube_slice = cube_slice[cube_slice[group_by_field].isin(entities)]
+
+    counts = (
+        cube_slice.groupby(['TAG', 'KONTROLLE', group_by_field], observed=True)['ANZAHL']
+        .sum()
+        .unstack(['KONTROLLE', group_by_field], fill_value=0)
+    )
+    counts.index = pd.DatetimeIndex(counts.index, name='TAG')
+    counts.columns = pd.MultiIndex.from_arrays(
+        [counts.columns.get_level_values(0).astype(object), counts.columns.get_level_values(1).astype(object)],
+        names=['KONTROLLE', 'EINTRAG'],
+    )
+    return counts
+
+
+def trend_rates(counts, rule='D', window=1):
+    """
+    Quote je Periode, Ergebnis und Eintrag.
+
+    Parameters:
+    counts (pandas.DataFrame): Ergebnis von daily_counts.
+    rule (str): resample-Regel, siehe AUFLOESUNGEN.
+    window (int): Gleitendes Fenster in Perioden (1 = ohne Glättung).
+
+    Returns:
+    pandas.DataFrame: Spalten TAG, EINTRAG, KONTROLLE, QUOTE (%), KONTROLLEN (Anzahl im Fenster).
+    Perioden ohne Kontrollen eines Eintrags entfallen.
+    """
+    columns = ['TAG', 'EINTRAG', 'KONTROLLE', 'QUOTE', 'KONTROLLEN']
+    if counts.empty:
+        return pd.DataFrame(columns=columns)
+
+    # Ein resample für alle Einträge; leere Perioden werden zu 0
+    periods = counts.resample(rule, label='left', closed='left').sum()
+    if window > 1:
+        periods = periods.rolling(window, min_periods=1).sum()
+
+    # Kontrollen je Eintrag und Periode, passend zu jeder Spalte
+    totals = periods.T.groupby(level='EINTRAG').sum().T
+    values = periods.to_numpy(dtype=float)
+    total_values = totals[periods.columns.get_level_values('EINTRAG')].to_numpy(dtype=float)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        quote = values / total_values * 100
+
+    rows, cols = values.shape
+    trend = pd.DataFrame({
+        'TAG': np.repeat(periods.index.to_numpy(), cols),
+        'EINTRAG': np.tile(periods.columns.get_level_values('EINTRAG').to_numpy(), rows),
+        'KONTROLLE': np.tile(periods.columns.get_level_values('KONTROLLE').to_numpy(), rows),
+        'QUOTE': quote.ravel(),
+        'KONTROLLEN': total_values.ravel(),
+    })
+    return trend[trend['KONTROLLEN'] > 0].reset_index(drop=True)
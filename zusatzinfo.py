@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+# ZUSATZINFO wird beim Einlesen einmalig in eine Bitmaske übersetzt.
+# Jeder bekannte Code bekommt ein Bit (Position in der Registry),
+# unbekannte Codes bleiben als Text in ZUSATZINFO_REST erhalten - ebenso
+# Wiederholungen eines bekannten Codes in derselben Zeile, damit jedes
+# Vorkommen gezählt wird (wie bisher mit explode).
+
+MASK_COLUMN = 'ZUSATZINFO_MASK'
+REST_COLUMN = 'ZUSATZINFO_REST'
+
+MAX_CODES = 63  # int64, Vorzeichenbit bleibt frei
+
+
+def build_registry(*code_lists):
+    """
+    Baut die Registry aus den Code-Listen (Reihenfolge bleibt erhalten, ohne Duplikate).
+    """
+    registry = tuple(dict.fromkeys(code for codes in code_lists for code in codes))
+    if len(registry) > MAX_CODES:
+        raise ValueError(f"Zu viele Zusatzinfo-Codes für eine int64-Maske: {len(registry)}")
+    return registry
+
+
+def code_mask(codes, registry):
+    """
+    Bitmaske für eine Liste von Codes (nicht registrierte Codes werden ignoriert).
+    """
+    mask = 0
+    for code in codes:
+        if code in registry:
+            mask |= 1 << registry.index(code)
+    return np.int64(mask)
+
+
+def encode(zusatzinfo, registry):
+    """
+    Übersetzt die ZUSATZINFO-Spalte in (Bitmaske, Rest).
+
+    Parameters:
+    zusatzinfo (pandas.Series): Leerzeichen-getrennte Codes, NaN erlaubt.
+    registry (tuple): Bekannte Codes, Position = Bit.
+
+    Returns:
+    tuple: (int64-Series mit der Maske, Series mit unbekannten Codes oder NaN)
+    """
+    bit_of = {code: i for i, code in enumerate(registry)}
+
+    tokens = zusatzinfo.astype(object).str.split().explode().dropna().to_frame('code')
+
+    # Erstes Vorkommen eines bekannten Codes setzt das Bit, Wiederholungen gehen in den Rest
+    bits = tokens['code'].map(bit_of)
+    repeated = tokens.reset_index().duplicated().to_numpy()
+    known = bits.notna().to_numpy() & ~repeated
+
+    values = np.left_shift(np.int64(1), bits[known].to_numpy(dtype=np.int64))
+    mask = (
+        pd.Series(values, index=tokens.index[known])
+        .groupby(level=0)
+        .sum()
+        .reindex(zusatzinfo.index, fill_value=0)
+        .astype(np.int64)
+    )
+
+    rest = (
+        tokens.loc[~known, 'code']
+        .groupby(level=0)
+        .agg(' '.join)
+        .reindex(zusatzinfo.index)
+    )
+    return mask, rest
+
+
+def has_any(mask, codes, registry):
+    """
+    Boolesche Series: enthält die Zeile mindestens einen der Codes?
+    """
+    return (mask & code_mask(codes, registry)) != 0
+
+
+def remove(mask, codes, registry):
+    """
+    Entfernt die Codes aus der Maske.
+    """
+    return mask & ~code_mask(codes, registry)
+
+
+def remove_rest(rest, codes):
+    """
+    Entfernt die Codes auch aus dem Rest (wiederholte Codes einer Zeile).
+    """
+    codes = set(codes)
+    present = rest.dropna()
+    cleaned = present.str.split().map(lambda tokens: ' '.join(t for t in tokens if t not in codes))
+    return cleaned[cleaned != ''].reindex(rest.index)
+
+
+def count_by(df, by, registry):
+    """
+    Zählt die Zusatzinfos je Ausprägung von `by` (entspricht explode + groupby + pivot).
+
+    Returns:
+    pandas.DataFrame: Index ZUSATZINFO, Spalten = Ausprägungen von `by`.
+    """
+    mask = df[MASK_COLUMN].to_numpy(dtype=np.int64)
+    bits = ((mask[:, None] >> np.arange(len(registry), dtype=np.int64)) & 1).astype(np.int32)
+    counts = pd.DataFrame(bits, columns=list(registry)).groupby(df[by].to_numpy()).sum().T
+
+    # Unbekannte Codes (selten) klassisch auszählen
+    if REST_COLUMN in df.columns and df[REST_COLUMN].notna().any():
+        rest = df[[REST_COLUMN, by]].dropna(subset=[REST_COLUMN])
+        rest = rest.assign(**{REST_COLUMN: rest[REST_COLUMN].str.split()}).explode(REST_COLUMN)
+        rest_counts = rest.groupby([REST_COLUMN, by], observed=True).size().unstack(fill_value=0)
+        # Wiederholte bekannte Codes stehen in beiden Teilen - zu einer Zeile zusammenfassen
+        counts = pd.concat([counts, rest_counts]).fillna(0).groupby(level=0).sum().astype(np.int64)
+
+    counts = counts[counts.sum(axis=1) > 0]
+    counts.index.name = 'ZUSATZINFO'
+    counts.columns.name = by
+    return counts